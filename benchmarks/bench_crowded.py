@@ -0,0 +1,103 @@
+"""Time to capture with a bystander walking behind the user, with and without following faces across frames.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_crowded [image directory]   (defaults to images/)
+
+Every selfie becomes a crowded clip (benchmarks.clips.crowded_clip) with the face from the next selfie as the bystander,
+and the user's own zone as the target. The faces are detected once per frame by the detector and tracker the app runs
+(FACE_DETECTOR_BACKEND, USE_FACE_TRACKING), then the same detections are replayed through SelfieSession twice:
+
+- largest face: the biggest face on every frame is the user, so the bystander takes over whenever they get closer
+- association: faces are matched across frames (utils.association) and the session stays locked on the user
+
+With tracking on, frames between full detections only carry the tracked face, so the bystander only reaches the session on
+the detection frames. Every clip prints on how many frames the user's own face was found.
+"""
+import glob
+import os
+import statistics
+import sys
+
+import cv2
+
+from benchmarks.clips import crowded_clip
+from constant import FACE_DETECTOR_BACKEND, USE_FACE_TRACKING
+from selfie_bench import build_detector
+from utils.association import FaceAssociator, iou_matrix
+from utils.detectors import create_face_detector
+from utils.session import CAPTURE, SelfieSession
+from utils.zones import get_zone_layout
+
+FPS = 15
+FRAMES = 300
+WIDTH = 960
+MARGIN = 0.25 #around the bystander's face in the crop pasted into the clip
+
+
+def replay(detections, frame_size, target, associate):
+    """Seconds until the picture was taken, None when it wasn't taken before the clip ended"""
+    session = SelfieSession(target, frame_size, clock=lambda: 0.0, verbose=False, associator=FaceAssociator() if associate else None)
+    if not associate:
+        session.associator = None
+    for i, faces in enumerate(detections):
+        for event in session.step(None, i / FPS, faces=faces):
+            if event.kind == CAPTURE:
+                return event.session_time
+    return None
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "images"
+    # only finds the faces to cut out of the selfies, the clips go through the app's own detector below
+    detector = create_face_detector("haar", multi_resolution=False)
+
+    selfies = []
+    for file in sorted(glob.glob(os.path.join(path, "*.jpg")) + glob.glob(os.path.join(path, "*.png"))):
+        image = cv2.imread(file)
+        if image is None:
+            continue
+        faces = detector(image)
+        if len(faces) > 0:
+            selfies.append((os.path.basename(file), image, max(faces, key=lambda f: f[2] * f[3])))
+
+    if len(selfies) < 2:
+        print(f"Need at least two selfies with a face in {path}")
+        return
+
+    results = {"largest face": [], "association": []}
+    for i, (name, image, face) in enumerate(selfies):
+        _, other, (bx, by, bw, bh) = selfies[(i + 1) % len(selfies)]
+        margin = int(bw * MARGIN)
+        bystander = other[max(by - margin, 0):by + bh + margin, max(bx - margin, 0):bx + bw + margin]
+
+        clip = crowded_clip(image, face, bystander, frames=FRAMES, width=WIDTH, bystander_margin=MARGIN)
+        frame_size = (clip[0].shape[1], clip[0].shape[0])
+        app_detector = build_detector(FACE_DETECTOR_BACKEND, USE_FACE_TRACKING)
+        detections = [app_detector(frame) for frame in clip]
+
+        layout = get_zone_layout(*frame_size, "quadrants")
+        scale = WIDTH / image.shape[1]
+        user = tuple(int(v * scale) for v in face)
+        inside = layout.containment([user])[0]
+        if not inside.any():
+            continue
+        target = layout.names[inside.argmax()]
+
+        crowded = sum(len(faces) > 1 for faces in detections)
+        user_found = sum(len(faces) > 0 and iou_matrix([user], faces).max() > 0.3 for faces in detections)
+        line = f"{name:<28} user {user[2]:3d} px found on {user_found:3d}/{len(clip)} frames, {crowded:3d} with 2+ faces"
+        for variant, times in results.items():
+            seconds = replay(detections, frame_size, target, variant == "association")
+            times.append(seconds if seconds is not None else FRAMES / FPS)
+            line += f"  {variant}: " + (f"{seconds:5.2f} s" if seconds is not None else " none ")
+        print(line)
+
+    print(f"\n{len(results['association'])} crowded clips of {FRAMES / FPS:.0f} s at {FPS} fps (no capture counts as the clip length)")
+    for variant, times in results.items():
+        if times:
+            print(f"{variant:<14} median time to capture {statistics.median(times):5.2f} s, mean {statistics.mean(times):5.2f} s")
+
+
+if __name__ == "__main__":
+    main()
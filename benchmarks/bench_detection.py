@@ -0,0 +1,78 @@
+"""Compare full resolution Haar detection against the downscaled + ROI search in utils.detection.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_detection [video, image or directory]   (defaults to images/)
+
+The full resolution search is the reference: recall is the share of the frames where it found a face that the downscaled + ROI
+search found one too, and misses are the frames where it didn't. The IoU only covers frames where both found a face.
+"""
+import sys
+import time
+from collections import Counter
+
+import cv2
+
+from benchmarks.bench_tracking import box_iou
+from benchmarks.clips import load_clips
+from utils.detection import MultiResolutionDetector, count_cascade_windows
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "images"
+    face_classifier = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    window_size = face_classifier.getOriginalWindowSize()
+
+    full_time = multi_res_time = 0.0
+    full_windows = multi_res_windows = 0
+    frames_total = 0
+    full_hits_total = misses_total = 0
+    ious = []
+
+    for name, frames in load_clips(path):
+        detector = MultiResolutionDetector(face_classifier)
+        full_hits = hits = misses = extra = 0
+        searches = Counter()
+
+        for frame in frames:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            height, width = gray.shape[:2]
+
+            start = time.perf_counter()
+            full_faces = face_classifier.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=10, minSize=(30, 30))
+            full_time += time.perf_counter() - start
+            full_windows += count_cascade_windows(width, height, window_size, 1.1, (30, 30))
+
+            start = time.perf_counter()
+            faces = detector(gray)
+            multi_res_time += time.perf_counter() - start
+            multi_res_windows += detector.candidates_evaluated
+            searches[detector.last_search] += 1
+
+            full_hits += len(full_faces) > 0
+            hits += len(faces) > 0
+            misses += len(full_faces) > 0 and len(faces) == 0
+            extra += len(full_faces) == 0 and len(faces) > 0
+            if len(full_faces) > 0 and len(faces) > 0:
+                ious.append(box_iou(max(full_faces, key=lambda f: f[2] * f[3]), max(faces, key=lambda f: f[2] * f[3])))
+
+        frames_total += len(frames)
+        full_hits_total += full_hits
+        misses_total += misses
+        recall = f"{(full_hits - misses) / full_hits:.0%}" if full_hits else "n/a"
+        print(f"{name}: {len(frames)} frames, face found full res {full_hits}, downscaled + ROI {hits} | recall {recall}, "
+              f"{misses} missed, {extra} only found downscaled | searches: " + ", ".join(f"{k} {v}" for k, v in sorted(searches.items())))
+
+    if not frames_total:
+        print(f"No frames found in {path}")
+        return
+
+    print(f"\nFull resolution: {1000 * full_time / frames_total:.2f} ms/frame, {full_windows // frames_total} candidates/frame")
+    print(f"Downscaled + ROI: {1000 * multi_res_time / frames_total:.2f} ms/frame, {multi_res_windows // frames_total} candidates/frame")
+    recall = f"{(full_hits_total - misses_total) / full_hits_total:.1%}" if full_hits_total else "n/a"
+    print(f"Speedup {full_time / max(multi_res_time, 1e-9):.1f}x, recall {recall} ({misses_total} of {full_hits_total} faces missed), "
+          f"mean IoU {sum(ious) / max(len(ious), 1):.2f} over the {len(ious)} frames where both found a face")
+
+
+if __name__ == "__main__":
+    main()
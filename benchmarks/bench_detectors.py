@@ -0,0 +1,71 @@
+"""Latency and accuracy of every face detector backend on CPU.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_detectors [image directory]   (defaults to images/)
+
+Every image in the directory is expected to be a selfie with exactly one face, so accuracy is the share of images
+where the backend found exactly one face, and false positives are the extra boxes it found. Backends whose model
+file or dependency is missing are skipped.
+"""
+import glob
+import os
+import sys
+import time
+
+import cv2
+
+from utils.detectors import DETECTOR_BACKENDS, create_face_detector
+
+BATCH_SIZE = 4
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(int(len(values) * pct / 100), len(values) - 1)]
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "images"
+    images = [cv2.imread(file) for file in sorted(glob.glob(os.path.join(path, "*.jpg")) + glob.glob(os.path.join(path, "*.png")))]
+    # benchmark at a typical 720p webcam size
+    images = [cv2.resize(image, (1280, int(image.shape[0] * 1280 / image.shape[1]))) for image in images if image is not None]
+
+    if not images:
+        print(f"No images found in {path}")
+        return
+
+    for backend in DETECTOR_BACKENDS:
+        try:
+            # the configuration the app runs (for haar the downscaled search of USE_MULTI_RESOLUTION_DETECTION)
+            detector = create_face_detector(backend)
+        except (FileNotFoundError, ImportError) as e:
+            print(f"{backend}: skipped ({e})")
+            continue
+
+        # warm up so that lazy allocations aren't counted
+        detector.detect(images[0])
+
+        latencies = []
+        single_face = false_positives = 0
+        for image in images:
+            # the images are unrelated, nothing found on the previous one should narrow the search
+            detector.reset()
+            start = time.perf_counter()
+            faces = detector.detect(image)
+            latencies.append(1000 * (time.perf_counter() - start))
+            single_face += len(faces) == 1
+            false_positives += max(len(faces) - 1, 0)
+
+        start = time.perf_counter()
+        for i in range(0, len(images), BATCH_SIZE):
+            detector.reset()
+            detector.detect_batch(images[i:i + BATCH_SIZE])
+        batch_latency = 1000 * (time.perf_counter() - start) / len(images)
+
+        print(f"{backend}: p50 {percentile(latencies, 50):.1f} ms, p95 {percentile(latencies, 95):.1f} ms, "
+              f"batched {batch_latency:.1f} ms/image | exactly one face {single_face}/{len(images)}, false positives {false_positives}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Cost of the facing-the-camera check in the capture decision.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_facing [image directory]   (defaults to images/)
+
+Every selfie is held still in front of a simulated 30 fps camera for a few seconds with its own zone as the target, and the
+decision time per frame (SelfieSession.step, which includes the best frame scoring) is compared between:
+
+- before: no facing check, the best frame buffer runs the eye cascade on the whole face every frame
+- full face every frame: the facing check gates the capture, whole face, no caching
+- upper half every frame: only the top of the face is searched, no caching
+- upper half + cache: what the app uses (FACING_CHECK_EYE_REGION, FACING_CHECK_CACHE_FRAMES)
+"""
+import glob
+import os
+import sys
+import time
+
+import cv2
+
+from constant import FACING_CHECK_CACHE_FRAMES, FACING_CHECK_EYE_REGION
+from utils.best_frame import BestFrameBuffer
+from utils.detectors import create_face_detector, load_cascade
+from utils.facing import FacingCheck
+from utils.session import SelfieSession
+from utils.zones import get_zone_layout
+
+FPS = 30
+HOLD_FRAMES = 90
+
+VARIANTS = [
+    ("before", None),
+    ("full face every frame", dict(eye_region=1.0, cache_frames=1)),
+    ("upper half every frame", dict(eye_region=FACING_CHECK_EYE_REGION, cache_frames=1)),
+    ("upper half + cache", dict(eye_region=FACING_CHECK_EYE_REGION, cache_frames=FACING_CHECK_CACHE_FRAMES)),
+]
+
+
+def hold_still(frame, face, target, eye_classifier, facing_options):
+    """Decision time per frame in ms and how many times the facing check ran its cascade"""
+    session = SelfieSession(target, (frame.shape[1], frame.shape[0]), clock=lambda: 0.0, verbose=False,
+                            best_frames=BestFrameBuffer(eye_classifier=eye_classifier))
+    session.facing_check = FacingCheck(eye_classifier, **facing_options) if facing_options is not None else None
+
+    timings = []
+    for i in range(HOLD_FRAMES):
+        start = time.perf_counter()
+        session.step(frame, i / FPS, faces=[face])
+        timings.append(1000 * (time.perf_counter() - start))
+        if session.finished:
+            break
+    checks = session.facing_check.checks if session.facing_check is not None else 0
+    return timings, checks
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "images"
+    detector = create_face_detector("haar", multi_resolution=False)
+    eye_classifier = load_cascade('haarcascade_eye.xml')
+
+    cases = []
+    for file in sorted(glob.glob(os.path.join(path, "*.jpg")) + glob.glob(os.path.join(path, "*.png"))):
+        image = cv2.imread(file)
+        if image is None:
+            continue
+        # a typical 720p webcam frame
+        frame = cv2.resize(image, (1280, int(image.shape[0] * 1280 / image.shape[1])))
+        faces = detector(frame)
+        if not faces:
+            continue
+        face = max(faces, key=lambda f: f[2] * f[3])
+        layout = get_zone_layout(frame.shape[1], frame.shape[0], "quadrants")
+        inside = layout.containment([face])[0]
+        if inside.any():
+            cases.append((frame, face, layout.names[inside.argmax()]))
+
+    if not cases:
+        print(f"No selfies with a face fully inside a zone found in {path}")
+        return
+
+    print(f"{len(cases)} selfies, {HOLD_FRAMES} frames held still at {FPS} fps")
+    for name, options in VARIANTS:
+        timings, checks = [], 0
+        for frame, face, target in cases:
+            case_timings, case_checks = hold_still(frame, face, target, eye_classifier, options)
+            timings.extend(case_timings)
+            checks += case_checks
+        timings.sort()
+        print(f"{name:<24} mean {sum(timings) / len(timings):6.2f} ms/frame, p95 {timings[int(len(timings) * 0.95)]:6.2f} ms, "
+              f"facing checks {checks}/{len(timings)} frames")
+
+
+if __name__ == "__main__":
+    main()
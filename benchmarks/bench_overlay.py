@@ -0,0 +1,41 @@
+"""Microbenchmark: drawing the quadrant grid on every frame vs compositing the cached overlay layer.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_overlay
+"""
+import time
+
+import numpy as np
+
+from utils.overlay import OverlayCompositor
+from utils.view import draw_quadrants_and_center_box
+
+ITERATIONS = 300
+
+
+def per_frame_ms(function, frame):
+    function(frame)
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        function(frame)
+    return 1000 * (time.perf_counter() - start) / ITERATIONS
+
+
+def main():
+    rng = np.random.default_rng(0)
+    for width, height in [(640, 480), (1280, 720), (1920, 1080)]:
+        frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        compositor = OverlayCompositor()
+
+        # old way: copy the frame (copy_of_frame) and draw the lines, box and labels again
+        drawn = draw_quadrants_and_center_box(frame.copy())
+        assert np.array_equal(drawn, compositor.compose(frame)), "cached overlay doesn't match the drawn one"
+
+        draw_ms = per_frame_ms(lambda f: draw_quadrants_and_center_box(f.copy()), frame)
+        compose_ms = per_frame_ms(compositor.compose, frame)
+        print(f"{width}x{height}: copy + draw {draw_ms:.3f} ms, cached composite {compose_ms:.3f} ms ({draw_ms / compose_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
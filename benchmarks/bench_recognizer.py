@@ -0,0 +1,58 @@
+"""Latency and accuracy of the offline speech recognizer on recorded answers, without a microphone.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_recognizer [wav directory]   (defaults to recordings/)
+
+Recordings have to be 16 bit mono WAV files named after what is said in them, e.g. top_left_1.wav or center_2.wav.
+For every file it reports what was recognized, how much of the audio had to be heard before the answer was known
+(the streaming recognizer stops at the first valid position) and how long recognition took on the CPU.
+"""
+import glob
+import os
+import sys
+import time
+
+from constant import VALID_POSITIONS
+from utils.recognizers import VoskSpeechRecognizer, WavFileStream, find_phrase
+
+
+def expected_phrase(path):
+    words = os.path.splitext(os.path.basename(path))[0].replace("_", " ")
+    return find_phrase(words, VALID_POSITIONS)
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "recordings"
+    files = sorted(glob.glob(os.path.join(path, "*.wav")))
+    if not files:
+        print(f"No recordings found in {path}")
+        return
+
+    try:
+        recognizer = VoskSpeechRecognizer(audio_source=WavFileStream(files[0]))
+    except (FileNotFoundError, ImportError) as e:
+        print(f"vosk: skipped ({e})")
+        return
+
+    correct = 0
+    heard = total = processing = 0.0
+    for file in files:
+        stream = recognizer.audio_source = WavFileStream(file)
+        start = time.perf_counter()
+        text = recognizer.listen(VALID_POSITIONS, timeout=stream.duration, phrase_time_limit=stream.duration)
+        elapsed = time.perf_counter() - start
+
+        answer = find_phrase(text or "", VALID_POSITIONS)
+        correct += answer == expected_phrase(file)
+        heard += recognizer.audio_seconds
+        total += stream.duration
+        processing += elapsed
+        print(f"{os.path.basename(file)}: heard '{text}' -> {answer} (expected {expected_phrase(file)}) | answer after "
+              f"{recognizer.audio_seconds:.1f} of {stream.duration:.1f} s of audio, {elapsed * 1000:.0f} ms of CPU")
+
+    print(f"vosk: {correct}/{len(files)} correct, needed {heard / total:.0%} of the audio on average, real time factor {processing / heard:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Time, frames and CPU to reach a capture when the user holds still right on the edge of the target zone, with and without
+the face box filter and zone hysteresis (SMOOTH_FACE_BOX, ZONE_HYSTERESIS_PX).
+
+Run from the repo root:
+
+    python -m benchmarks.bench_smoothing [image directory]   (defaults to images/)
+
+Users stop moving as soon as they are told to hold still, so their face usually ends up just inside the target. Every selfie
+is moved so the face is EDGE_INSIDE_PX pixels inside the nearest edge of its own zone, and filmed by a slightly shaking, noisy
+camera (benchmarks.clips.shaky_clip). The clips go through selfie_bench.replay_clip with the app's detector and tracker.
+"""
+import glob
+import os
+import statistics
+import sys
+
+import cv2
+
+from benchmarks.clips import shaky_clip
+from constant import FACE_DETECTOR_BACKEND, USE_FACE_TRACKING
+from selfie_bench import build_detector, replay_clip
+from utils.detectors import create_face_detector
+from utils.zones import get_zone_layout
+
+FPS = 30
+FRAMES = 300
+EDGE_INSIDE_PX = 4
+
+
+def offset_to_edge(face, rect, inside):
+    """Shift (dx, dy) that puts the face box inside pixels from the nearest edge of the zone rectangle"""
+    x, y, w, h = face
+    x0, y0, x1, y1 = rect
+    gaps = {"left": x - x0, "right": x1 - (x + w), "top": y - y0, "bottom": y1 - (y + h)}
+    edge = min(gaps, key=gaps.get)
+    shift = gaps[edge] - inside
+    return {"left": (-shift, 0), "right": (shift, 0), "top": (0, -shift), "bottom": (0, shift)}[edge]
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "images"
+    detector = create_face_detector("haar", multi_resolution=False)
+
+    results = {"raw boxes": [], "smoothing": []}
+    for file in sorted(glob.glob(os.path.join(path, "*.jpg")) + glob.glob(os.path.join(path, "*.png"))):
+        image = cv2.imread(file)
+        if image is None:
+            continue
+        # a mirrored 720p webcam frame, like the app sees after the capture thread flipped it
+        frame = cv2.flip(cv2.resize(image, (1280, int(image.shape[0] * 1280 / image.shape[1]))), 1)
+        faces = detector(frame)
+        if len(faces) == 0:
+            continue
+        face = max(faces, key=lambda f: f[2] * f[3])
+        layout = get_zone_layout(frame.shape[1], frame.shape[0], "quadrants")
+        inside = layout.containment([face])[0]
+        if not inside.any():
+            continue
+        target = int(inside.argmax())
+
+        clip = shaky_clip(frame, FRAMES, offset_to_edge(face, layout.rects[target], EDGE_INSIDE_PX))
+        line = f"{os.path.basename(file):<28} {layout.names[target]:<12}"
+        for variant, runs in results.items():
+            result = replay_clip(clip, FPS, build_detector(FACE_DETECTOR_BACKEND, USE_FACE_TRACKING), layout.names[target],
+                                 mirror=False, smoothing=variant == "smoothing")
+            runs.append(result)
+            ttc = f"{result['time_to_capture_s']:5.2f} s" if result["captured"] else " none  "
+            line += f"  {variant}: {ttc} {result['frames_processed']:3d} frames {result['countdown_starts']:2d} countdowns"
+        print(line)
+
+    if not results["smoothing"]:
+        print(f"No selfies with a face fully inside a zone found in {path}")
+        return
+
+    print(f"\n{len(results['smoothing'])} clips of {FRAMES / FPS:.0f} s at {FPS} fps held {EDGE_INSIDE_PX} px inside the target edge "
+          f"(no capture counts as the clip length)")
+    for variant, runs in results.items():
+        times = [r["time_to_capture_s"] if r["captured"] else FRAMES / FPS for r in runs]
+        print(f"{variant:<10} captured {sum(r['captured'] for r in runs)}/{len(runs)}, median time to capture {statistics.median(times):5.2f} s, "
+              f"median frames {statistics.median(r['frames_processed'] for r in runs):5.0f}, "
+              f"median CPU {statistics.median(r['cpu_ms'] for r in runs):7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compare running the Haar cascade on every frame against detect-then-track.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_tracking [video, image or directory]   (defaults to images/)
+
+Still images are turned into short panning clips so the tracker has motion to follow.
+"""
+import sys
+import time
+
+import cv2
+
+from benchmarks.clips import load_clips
+from utils.tracker import DetectThenTrack
+
+
+def box_iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    inter_w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    inter_h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    intersection = inter_w * inter_h
+    union = aw * ah + bw * bh - intersection
+    return intersection / union if union else 0.0
+
+
+def run(detect, gray_frames):
+    boxes = []
+    start = time.perf_counter()
+    for gray in gray_frames:
+        faces = detect(gray)
+        boxes.append(max(faces, key=lambda f: f[2] * f[3]) if len(faces) > 0 else None)
+    return boxes, time.perf_counter() - start
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "images"
+    face_classifier = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+
+    def detect_faces(gray_frame):
+        return face_classifier.detectMultiScale(gray_frame, scaleFactor=1.1, minNeighbors=10, minSize=(30, 30))
+
+    total_frames = 0
+    total_detect_time = 0.0
+    total_track_time = 0.0
+    ious = []
+
+    for name, frames in load_clips(path):
+        gray_frames = [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in frames]
+
+        detected_boxes, detect_time = run(detect_faces, gray_frames)
+        tracker = DetectThenTrack(detect_faces)
+        tracked_boxes, track_time = run(tracker, gray_frames)
+
+        clip_ious = [box_iou(d, t) for d, t in zip(detected_boxes, tracked_boxes) if d is not None and t is not None]
+        ious.extend(clip_ious)
+        total_frames += len(frames)
+        total_detect_time += detect_time
+        total_track_time += track_time
+
+        print(f"{name}: {len(frames)} frames | every frame {1000 * detect_time / len(frames):.2f} ms/frame | "
+              f"detect+track {1000 * track_time / len(frames):.2f} ms/frame ({tracker.detections} detections) | "
+              f"mean IoU {sum(clip_ious) / max(len(clip_ious), 1):.2f}")
+
+    if not total_frames:
+        print(f"No frames found in {path}")
+        return
+
+    print(f"\nTotal: {total_frames} frames | every frame {1000 * total_detect_time / total_frames:.2f} ms/frame | "
+          f"detect+track {1000 * total_track_time / total_frames:.2f} ms/frame | "
+          f"speedup {total_detect_time / max(total_track_time, 1e-9):.1f}x | mean IoU {sum(ious) / max(len(ious), 1):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Time to first audio of the session phrases, synthesized every time vs played from the phrase cache.
+
+Run from the repo root on a machine with a text to speech engine and an audio player (see TTS_PHRASE_CACHE in constant.py):
+
+    python -m benchmarks.bench_tts_cache
+
+Synthesizing a phrase to a file is what the engine has to get through before the cache can play anything, and bounds how
+long speaking it from scratch takes before the first sound. The cached number is the cache lookup plus starting playback.
+The cache lives in a temporary directory, TTS_PHRASE_CACHE_DIR isn't touched.
+"""
+import statistics
+import tempfile
+import time
+
+from utils.phrase_cache import CachedPhraseEngine, PhraseCache, create_player, reachable_phrases
+from utils.tts import create_platform_engine
+
+
+def main():
+    engine = create_platform_engine()
+    player = create_player()
+    if not hasattr(engine, "synthesize") or player is None:
+        print(f"Needs a text to speech engine that can write audio files and an audio player (engine: {type(engine).__name__}, "
+              f"player: {type(player).__name__ if player else None})")
+        return
+
+    phrases = reachable_phrases()
+    with tempfile.TemporaryDirectory() as directory:
+        cached = CachedPhraseEngine(engine, PhraseCache(directory), player, precompute=phrases)
+
+        synthesis_ms = []
+        while True:
+            start = time.perf_counter()
+            if not cached.idle_work():
+                break
+            synthesis_ms.append((time.perf_counter() - start) * 1000)
+
+        first_audio_ms = []
+        for text in phrases:
+            start = time.perf_counter()
+            player.start(cached.cache.get(cached.key(text)))
+            first_audio_ms.append((time.perf_counter() - start) * 1000)
+            player.stop()
+
+    print(f"{len(phrases)} phrases, {type(engine).__name__} engine, {type(player).__name__}")
+    for name, values in (("synthesized", synthesis_ms), ("cached", first_audio_ms)):
+        values.sort()
+        print(f"{name:<12} median {statistics.median(values):7.1f} ms, p95 {values[int(len(values) * 0.95)]:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
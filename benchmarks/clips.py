@@ -0,0 +1,101 @@
+import glob
+import os
+
+import cv2
+import numpy as np
+
+
+def synthetic_clip_from_image(image, frames=60, max_shift=0.15, width=1280):
+    """Turn a still selfie into a short clip by sliding a camera-sized window across it, so tracking has some motion to follow"""
+    scale = width / image.shape[1]
+    image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    height, width = image.shape[:2]
+
+    crop_w, crop_h = int(width * (1 - max_shift)), int(height * (1 - max_shift))
+    span_x, span_y = width - crop_w, height - crop_h
+
+    clip = []
+    for i in range(frames):
+        # move right then back left, and a little up and down
+        progress = i / max(frames - 1, 1)
+        sweep = 1 - abs(2 * progress - 1)
+        x = int(span_x * sweep)
+        y = int(span_y * (0.5 + 0.5 * (sweep - 0.5)))
+        clip.append(image[y:y + crop_h, x:x + crop_w].copy())
+    return clip
+
+
+def crowded_clip(image, user_face, bystander, frames=300, width=960, enter_frame=8, cycles=5, bystander_margin=0.25):
+    """A still selfie with a bystander's face walking back and forth behind the user, getting closer and further from the camera.
+
+    user_face is the user's (x, y, w, h) in image, bystander a crop of someone else's face with bystander_margin of its face width
+    added on every side. The bystander walks in at enter_frame, stays on the other half of the frame so they never cover the user,
+    and their face goes from half the size of the user's to a little bigger.
+    """
+    scale = width / image.shape[1]
+    image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    height = image.shape[0]
+    ux, uy, uw, uh = [int(v * scale) for v in user_face]
+
+    on_left = ux + uw / 2 > width / 2
+    lane_x0, lane_x1 = (0, width // 2) if on_left else (width // 2, width)
+
+    clip = []
+    for i in range(frames):
+        if i < enter_frame:
+            clip.append(image.copy())
+            continue
+        phase = (i - enter_frame) / frames * 2 * np.pi
+        size = int(uw * (1 + 2 * bystander_margin) * (0.75 + 0.3 * np.sin(phase * cycles + np.pi / 4)))
+        face = cv2.resize(bystander, (size, int(size * bystander.shape[0] / bystander.shape[1])), interpolation=cv2.INTER_AREA)
+        fh, fw = face.shape[:2]
+        if fw >= lane_x1 - lane_x0 or fh >= height:
+            clip.append(image.copy())
+            continue
+
+        x = lane_x0 + int((lane_x1 - lane_x0 - fw) * (0.5 + 0.5 * np.sin(phase * 2)))
+        y = min(max(uy + (uh - fh) // 2, 0), height - fh)
+        frame = image.copy()
+        frame[y:y + fh, x:x + fw] = face
+        clip.append(frame)
+    return clip
+
+
+def shaky_clip(image, frames=300, offset=(0, 0), shake_px=2.0, noise=6.0, seed=0):
+    """A still selfie moved by offset pixels and filmed by a slightly shaking camera with sensor noise, like a user holding
+    still in front of a real webcam: the face doesn't move but the detector box jitters by a few pixels from frame to frame"""
+    rng = np.random.default_rng(seed)
+    height, width = image.shape[:2]
+    # a handful of noise patterns cycled through is enough to make every frame's box different
+    patterns = [rng.normal(0, noise, image.shape).astype(np.int16) for _ in range(8)]
+
+    clip = []
+    for i in range(frames):
+        dx, dy = offset[0] + rng.normal(0, shake_px), offset[1] + rng.normal(0, shake_px)
+        frame = cv2.warpAffine(image, np.float32([[1, 0, dx], [0, 1, dy]]), (width, height), borderMode=cv2.BORDER_REFLECT)
+        clip.append(np.clip(frame + patterns[i % len(patterns)], 0, 255).astype(np.uint8))
+    return clip
+
+
+def load_clips(path, frames_per_image=60):
+    """Load (name, frames) pairs from a video file, a single image or a directory of images/videos"""
+    if os.path.isdir(path):
+        clips = []
+        for file in sorted(glob.glob(os.path.join(path, "*"))):
+            clips.extend(load_clips(file, frames_per_image))
+        return clips
+
+    name = os.path.basename(path)
+    image = cv2.imread(path)
+    if image is not None:
+        return [(name, synthetic_clip_from_image(image, frames_per_image))]
+
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frames.append(frame)
+    capture.release()
+    return [(name, frames)] if frames else []
@@ -2,5 +2,88 @@ GUIDANCE_INTERVAL=7
 INITIAL_FACE_DETECTION_WAIT_TIME=3
 MAX_ATTEMPTS_TO_GET_A_TARGET_POSITION =3
 VALID_POSITIONS = ["top left", "top right", "bottom left", "bottom right", "center"]
-REQUIRED_STABLE_FRAMES=30
-EDGE_THRESHOLD=0.1
\ No newline at end of file
+STABLE_HOLD_TIME=3 #seconds the face has to stay still in the target before the picture is taken
+STABLE_MAX_JITTER_PX=25 #how far (in pixels) the face center may wander from its moving average while holding still
+STABLE_EMA_ALPHA=0.3 #smoothing of the face center moving average (higher follows the face faster)
+EDGE_THRESHOLD=0.1
+FRAME_BUFFER_SIZE=2 #how many of the newest camera frames are kept around, older ones are dropped rather than queued
+SHOW_PIPELINE_FPS=True #draw capture/detect/render fps on the preview
+TTS_RATE=150 #words per minute for pyttsx3/espeak
+USE_FACE_TRACKING=True #run the full face detector only every few frames and track the face in between
+TRACKER_REDETECT_INTERVAL=10 #tracked frames before the full detector runs again
+TRACKER_MIN_CONFIDENCE=0.6 #template match score below which the tracker gives up and we detect again
+TRACKER_SEARCH_MARGIN=0.5 #how far around the last box (as a fraction of its size) the tracker searches
+TRACKER_TEMPLATE_WIDTH=48 #the face template is shrunk to this width to keep tracking cheap
+DETECTION_DOWNSCALE=0.5 #the face detector shrinks frames by at most this factor (0.5 = half size, 0.25 = quarter size)
+DETECTION_MIN_WIDTH=960 #but never below this width: users' faces are ~70px at 960px wide, well above the cascade's 24px window. Narrower frames are searched at full resolution
+DETECTION_ROI_MARGIN=0.5 #once a face is known only search this far around it (as a fraction of the face size)
+DETECTION_ROI_MIN_SIZE_RATIO=0.6 #smallest face size searched in the ROI relative to the last face
+DETECTION_ROI_MAX_SIZE_RATIO=1.5 #biggest face size searched in the ROI relative to the last face
+USE_MULTI_RESOLUTION_DETECTION=True #haar only: use the downscaled + ROI search above instead of searching the full frame
+FACE_DETECTOR_BACKEND="haar" #one of: haar, yunet, ssd, onnx (can be overridden with --detector)
+YUNET_MODEL_PATH="models/face_detection_yunet_2023mar.onnx"
+SSD_PROTOTXT_PATH="models/deploy.prototxt"
+SSD_MODEL_PATH="models/res10_300x300_ssd_iter_140000.caffemodel"
+ONNX_MODEL_PATH="models/version-RFB-320.onnx"
+DNN_SCORE_THRESHOLD=0.7 #minimum confidence for the DNN face detectors
+DNN_INPUT_WIDTH=320 #frames are shrunk to this width before going through YuNet
+BEST_FRAME_BUFFER_SIZE=8 #how many of the best frames from the smile window are kept to pick the saved picture from
+BEST_FRAME_CHECK_EYES=True #prefer frames where both eyes are found when picking the picture to save
+BEST_FRAME_EYE_CHECK_WIDTH=96 #the face is shrunk to this width before looking for eyes to keep the check cheap
+SMILE_CAPTURE_DELAY=1.0 #seconds after "Perfect! Smile!" before frames can be saved: the prompt plays and the user smiles
+SMILE_CAPTURE_WINDOW=0.5 #the saved picture is the best frame of this many seconds after the delay
+CENTER_BOX_WIDTH_RATIO=0.3 #share of the frame width taken by the center box (so the face detector bounding box fits inside it)
+CENTER_BOX_HEIGHT_RATIO=0.45 #share of the frame height taken by the center box
+ZONE_LAYOUT="quadrants" #zone layout used for analysis: quadrants (4 quadrants + center box) or thirds (3x3 grid)
+IMAGES_DIR="images" #where the pictures are saved
+IMAGE_FORMAT="jpg" #jpg, png or webp
+JPEG_QUALITY=92
+PNG_COMPRESSION=3 #0 (fastest, biggest) to 9 (slowest, smallest)
+WEBP_QUALITY=90
+SAVE_METADATA_SIDECAR=True #write a .json next to every picture with the target zone, face box and timings
+OPEN_IMAGE_AFTER_SAVE=True #open the picture in the default viewer (without waiting for it)
+KIOSK_NEW_USER_TIME=0.1 #kiosk mode: how long a face has to be seen before a new session starts (filters out single frame false detections)
+KIOSK_USER_GONE_TIME=3 #kiosk mode: seconds without any face after which the next face is treated as a new user
+KIOSK_SAME_USER_SIMILARITY=0.7 #kiosk mode: face histograms correlating at least this much with the last user served are the same person
+KIOSK_ABANDON_TIME=20 #kiosk mode: a session ends when nobody has been in front of the camera for this many seconds
+SPEECH_RECOGNIZER_BACKEND="auto" #google (online), vosk (offline) or auto (vosk when it and its model are installed, google otherwise)
+VOSK_MODEL_PATH="models/vosk-model-small-en-us-0.15"
+RECOGNIZER_SAMPLE_RATE=16000 #microphone sample rate for the offline recognizer
+RECOGNIZER_CHUNK_MS=100 #audio is fed to the offline recognizer in chunks this long, partial results are checked after each one
+LISTEN_TIMEOUT=3 #seconds to wait for the user to start talking
+PHRASE_TIME_LIMIT=8 #longest the user can talk before we stop listening
+RECOGNIZER_OPERATION_TIMEOUT=5 #seconds Google gets to answer before the request is given up, so a listen never hangs on the network
+USE_VOICE_COMMANDS=True #listen for "retake", "change to <position>" and "cancel" while the camera is running (offline vosk recognizer only)
+VOICE_COMMAND_LISTEN_TIMEOUT=1 #the command listener starts a new listen this often so it can pause for our own prompts
+VOICE_COMMAND_PHRASE_LIMIT=3 #longest voice command in seconds
+VOICE_COMMAND_ECHO_GUARD=0.3 #seconds after a prompt ends during which the microphone is still ignored, so the app doesn't hear itself
+VOICE_COMMAND_RETAKE_WINDOW=4 #seconds after a picture is taken during which the user can say "retake"
+METRICS_ENABLED=True #time every stage of the loop (capture, flip, gray, detect, overlay, decision, display, tts) into histograms
+SHOW_METRICS_HUD=False #show the per stage timings on screen (toggle with 'h' while running)
+LOG_EVERY_FRAME=True #print where the face is on every frame (toggle with 'v' while running)
+METRICS_EXPORT_PATH="" #write the metrics here every few seconds, JSON for a .json path and Prometheus text otherwise (e.g. "metrics.prom"), empty to turn off
+METRICS_EXPORT_INTERVAL=5 #seconds between metrics exports
+REQUIRE_FACING_CAMERA=True #only take the picture once both eyes are found looking at the camera (needs BEST_FRAME_CHECK_EYES)
+FACING_CHECK_EYE_REGION=0.6 #the eyes are only searched for in this top share of the face (0.5 cuts the bottom of the eyes off on some faces)
+FACING_CHECK_CACHE_FRAMES=3 #reuse the last facing check result for this many frames while the face stays put
+FACING_CHECK_MAX_WAIT=4 #seconds to wait for the user to face the camera after holding still, then the picture is taken anyway (the eye cascade misses some faces)
+USE_FACE_ASSOCIATION=True #follow every face across frames and stay locked on the user's face instead of jumping to whichever face is biggest
+ASSOCIATION_CENTROID_WEIGHT=0.5 #match cost of a face with a track is (1 - IoU) + this * distance between their centers in face sizes
+ASSOCIATION_MAX_COST=1.5 #faces costing more than this to match with every track are a new person
+ASSOCIATION_MAX_MISSES=15 #frames a person can go undetected before they are forgotten (and someone else can become the user)
+CAMERA_SOURCE=0 #camera index, or a video file, image directory or glob pattern (e.g. "clips/*.jpg") to replay instead of a camera
+CAMERA_WIDTH=1280 #resolution asked from the camera, 0 keeps the driver's default
+CAMERA_HEIGHT=720
+CAMERA_FPS=30 #frame rate asked from the camera, 0 keeps the driver's default
+CAMERA_FOURCC="MJPG" #pixel format asked from the camera, most UVC webcams only reach full frame rate at 720p with MJPG ("" keeps the default, often YUYV)
+CAMERA_BUFFER_SIZE=1 #frames the driver may queue up, more means older (laggier) frames, 0 keeps the driver's default
+CAMERA_REPLAY_FPS=30 #frame rate image sequences are replayed at (video files play at their own)
+SMOOTH_FACE_BOX=True #filter the face box over time (one-euro filter) before deciding which zone it is in
+SMOOTHING_MIN_CUTOFF=1.0 #Hz, lower removes more jitter from a face held still but lags more
+SMOOTHING_BETA=0.02 #how much faster the filter follows a moving face (Hz more per pixel/second of movement)
+SMOOTHING_D_CUTOFF=1.0 #Hz, smoothing of the face speed the filter adapts to
+ZONE_HYSTERESIS_PX=10 #a face has to cross a zone edge by this many pixels before it counts as having left the zone (or its target)
+TTS_PHRASE_CACHE=True #play phrases said before from synthesized audio files instead of synthesizing them again (needs an audio player: sounddevice, winsound, afplay, paplay or aplay)
+TTS_PHRASE_CACHE_DIR="cache/tts"
+TTS_PHRASE_CACHE_MAX_MB=50 #least recently used phrases are deleted past this size
+TTS_PRECOMPUTE_PHRASES=True #synthesize every guidance phrase in the background while the app is idle, instead of on first use only
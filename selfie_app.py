@@ -1,235 +1,398 @@
+import argparse
+import threading
 import time
+from datetime import datetime
+
+from utils.startup import LazyResource, StartupProfile #first, so the startup profile counts the heavy imports below
 import cv2
 
-from constant import EDGE_THRESHOLD, GUIDANCE_INTERVAL, INITIAL_FACE_DETECTION_WAIT_TIME, REQUIRED_STABLE_FRAMES
-from utils.view import draw_quadrants_and_center_box, get_current_postion_where_the_face_lies, is_face_fully_in_target, save_image
-from utils.speech import get_guidance_for_user, get_target_position, speak
+from constant import (BEST_FRAME_CHECK_EYES, CAMERA_SOURCE, FACE_DETECTOR_BACKEND, FRAME_BUFFER_SIZE, KIOSK_ABANDON_TIME, METRICS_EXPORT_INTERVAL, METRICS_EXPORT_PATH,
+                      SHOW_METRICS_HUD, SHOW_PIPELINE_FPS, USE_FACE_TRACKING, USE_VOICE_COMMANDS, VOICE_COMMAND_RETAKE_WINDOW)
+from utils.best_frame import BestFrameBuffer
+from utils.camera import open_capture
+from utils.detectors import DETECTOR_BACKENDS, create_face_detector, load_cascade
+from utils.kiosk import NewUserDetector
+from utils.metrics import SESSION_BUCKETS_S, frame_logging_enabled, get_metrics, set_frame_logging
+from utils.pipeline import FramePipeline
+from utils.tracker import DetectThenTrack
+from utils.session import CAPTURE, SPEECH, SelfieSession
+from utils.zones import ZONE_NAMES
+from utils.overlay import OverlayCompositor
+from utils.storage import get_image_writer
+from utils.view import save_image
+from utils.speech import get_target_position, listener, speak, warm_up_microphone
+from utils.tts import PRIORITY_URGENT, get_speech_service
+from utils.voice_commands import CANCEL, CHANGE_TARGET, RETAKE, VoiceCommandListener
+
+WINDOW_NAME = 'Selfie App'
+
+
+def open_camera(source=CAMERA_SOURCE):
+    #make sure there aren't more than one face as this will trigger multiple detections. The code can handle this, but for your project this will cause an issue.
+    #the camera is asked for the resolution, frame rate, pixel format and buffer size in constant.py, a file or image directory is replayed instead
+    return open_capture(source)
+
+
+def start_speech_engine():
+    speech_service = get_speech_service()
+    speech_service.wait_until_ready()
+    return speech_service
+
+
+class SelfieApp:
+    """Camera, detector, pipeline and window that stay open across selfie sessions, so only the per-session state is rebuilt for every user"""
+
+    def __init__(self, detector_backend=FACE_DETECTOR_BACKEND, profile=None):
+        self.detector_backend = detector_backend
+        self.profile = profile or StartupProfile(enabled=False)
+
+        #Load the face detector (the haar cascade by default, see DETECTOR_BACKENDS for the DNN ones)
+        detect_faces = create_face_detector(detector_backend)
+
+        #between full detections just follow the face with a cheap tracker
+        self.face_detector = DetectThenTrack(detect_faces) if USE_FACE_TRACKING else detect_faces
+
+        #the eye cascade is used to prefer a picture where the eyes are open, the frame pool is allocated once and reused by every session
+        eye_classifier = load_cascade('haarcascade_eye.xml') if BEST_FRAME_CHECK_EYES else None
+        self.best_frames = BestFrameBuffer(eye_classifier=eye_classifier)
+
+        #the grid is drawn once per resolution and composited onto a reused display buffer
+        self.overlay = OverlayCompositor()
+
+        self.face_cap = None
+        self.pipeline = None
+        self.last_frame_seq = 0
+        self.last_frame_time = None
+        self.last_detection_seq = 0
+
+        #timings of every stage, shown with 'h' and written to METRICS_EXPORT_PATH
+        self.metrics = get_metrics()
+        self.show_hud = SHOW_METRICS_HUD
+        self.last_export = time.time()
+
+    def open(self, face_cap=None):
+        """Open the camera (unless an already opened one is passed) and window and start the capture and detection threads.
+        Returns False if the camera can't be opened"""
+        #Open your camera
+        self.face_cap = face_cap if face_cap is not None else open_camera()
+
+        if not self.face_cap.isOpened():
+            print("Couldn't open the camera")
+            return False
+
+        self.frame_width = int(self.face_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.frame_height = int(self.face_cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        cv2.namedWindow(WINDOW_NAME, cv2.WINDOW_NORMAL)
+        cv2.setWindowProperty(WINDOW_NAME, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+
+        #capture and detection run on their own threads, the loops below are the render stage and make the decisions whenever a new detection comes in
+        self.pipeline = FramePipeline(self.face_cap, self.face_detector, buffer_size=FRAME_BUFFER_SIZE).start()
+        return True
+
+    def close(self):
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            print(f"[INFO] Pipeline: {self.pipeline.fps_report()}, dropped frames: {self.pipeline.dropped_frames}")
+            self.metrics.increment("dropped_frames", self.pipeline.dropped_frames)
+        if METRICS_EXPORT_PATH:
+            self.metrics.export(METRICS_EXPORT_PATH)
+        if self.face_cap is not None:
+            self.face_cap.release()
+        cv2.destroyAllWindows()
+
+        #make sure the pictures are on disk before we quit
+        get_image_writer().close()
+
+    def _next_frame(self):
+        """(display frame, new detection or None) for the newest frame, None when there is no frame yet. Raises EOFError when the camera died"""
+        #Get the newest frame from the capture thread, stale frames are already dropped
+        packet = self.pipeline.next_frame(self.last_frame_seq)
+
+        if packet is None:
+            if self.pipeline.capture_failed:
+                raise EOFError("camera stopped delivering frames")
+            return None
+
+        self.last_frame_seq, clean_frame, self.last_frame_time = packet
+
+        # quadrants and center box only go on the display frame, the clean frame is what the detector sees and what gets saved
+        with self.metrics.time("overlay"):
+            im_frame = self.overlay.compose(clean_frame)
+
+        detection = self.pipeline.latest_detection()
+        if detection is None or detection.seq == self.last_detection_seq:
+            return im_frame, None
+        self.last_detection_seq = detection.seq
+        return im_frame, detection
+
+    def _show(self, im_frame):
+        """Show the display frame, returns False when 'q' was pressed"""
+        if SHOW_PIPELINE_FPS or self.show_hud:
+            cv2.putText(im_frame, self.pipeline.fps_report(), (20, self.frame_height - 50), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+        if self.show_hud:
+            for i, line in enumerate(self.metrics.hud_lines()):
+                cv2.putText(im_frame, line, (20, 100 + 20 * i), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+
+        with self.metrics.time("display"):
+            cv2.imshow(WINDOW_NAME, im_frame)
+            key = cv2.waitKey(1) & 0xFF
+        self.metrics.observe("latency", (time.time() - self.last_frame_time) * 1000) #from when the camera took the frame to the screen
+        self.profile.finish("first frame displayed")
+
+        if METRICS_EXPORT_PATH and time.time() - self.last_export >= METRICS_EXPORT_INTERVAL:
+            self.metrics.export(METRICS_EXPORT_PATH)
+            self.last_export = time.time()
+
+        # 'h' shows the timings on screen, 'v' turns the per frame prints on and off
+        if key == ord('h'):
+            self.show_hud = not self.show_hud
+        elif key == ord('v'):
+            set_frame_logging(not frame_logging_enabled())
+
+        # Exit on 'q' key
+        return key != ord('q')
+
+    def preview_until(self, is_done, on_detection=None):
+        """Keep the preview running until is_done() is true. on_detection is called with every new detection and can return True to stop.
+        Returns False if the user quit or the camera died"""
+        while not is_done():
+            try:
+                packet = self._next_frame()
+            except EOFError:
+                return False
+            if packet is None:
+                continue
+
+            im_frame, detection = packet
+            if detection is not None and on_detection is not None and on_detection(detection):
+                return True
+            if not self._show(im_frame):
+                return False
+        return True
+
+    def _start_voice_commands(self):
+        """Background listener for "retake", "change to ..." and "cancel", None when voice commands are off, there's no microphone
+        or the recognizer isn't offline (an online one would upload every noise the microphone hears while the camera runs)"""
+        if not USE_VOICE_COMMANDS:
+            return None
+        try:
+            recognizer = listener.get()
+        except Exception as e:
+            print(f"[INFO] Voice commands aren't available: {e}")
+            return None
+        if not recognizer.offline:
+            print(f"[INFO] Voice commands need the offline speech recognizer, not {recognizer.name}")
+            return None
+        return VoiceCommandListener(recognizer, get_speech_service()).start()
+
+    def run_session(self, target_position, abandon_after=None):
+        """Guide one user to the target position and take their picture.
+        Returns (session, keep_running), keep_running is False when 'q' was pressed or the camera died.
+        With abandon_after the session gives up when no face has been seen for that many seconds"""
+        voice = self._start_voice_commands()
+        try:
+            while True:
+                session, keep_running = self._guide(target_position, voice, abandon_after)
+                if not (keep_running and session.finished and voice is not None and self._wants_retake(voice)):
+                    return session, keep_running
+                target_position = session.target_position
+                speak("Okay, let's take another one.", priority=PRIORITY_URGENT)
+        finally:
+            if voice is not None:
+                voice.stop()
+
+    def _guide(self, target_position, voice, abandon_after):
+        self.best_frames.reset()
+        self.metrics.increment("sessions")
+        session = SelfieSession(target_position, (self.frame_width, self.frame_height), detector=self.face_detector, speech=speak,
+                                best_frames=self.best_frames)
+        last_face_time = time.time()
+
+        #Keep looping until 'q' is pressed to quit or an image has been captured
+        while True:
+            try:
+                packet = self._next_frame()
+            except EOFError:
+                return session, False
+            if packet is None:
+                continue
+
+            im_frame, detection = packet
+
+            #commands the user said since the last frame, the listener thread never holds this loop up
+            for command in voice.poll() if voice is not None else ():
+                if command.kind == CANCEL:
+                    speak("Okay, cancelled.", priority=PRIORITY_URGENT)
+                    return session, True
+                if command.kind == CHANGE_TARGET:
+                    session.change_target(command.position)
+                    speak(f"Okay, the target is now {command.position.replace('-', ' ')}.", priority=PRIORITY_URGENT)
+                elif command.kind == RETAKE:
+                    session.change_target(session.target_position)
+                    speak("Okay, starting over.", priority=PRIORITY_URGENT)
+
+            if detection is not None:
+                now = time.time()
+                if len(detection.faces) > 0:
+                    last_face_time = now
+                elif abandon_after is not None and now - last_face_time >= abandon_after:
+                    print("[INFO] No one in front of the camera anymore, ending the session")
+                    return session, True
+
+                with self.metrics.time("decision"):
+                    events = session.step(detection.frame, now, faces=detection.faces)
+
+                for event in events:
+                    if event.kind == CAPTURE:
+                        self._save_capture(event, session.target_position)
+                        self.metrics.increment("captures")
+                        self.metrics.observe("time_to_capture", event.session_time, SESSION_BUCKETS_S)
+                    elif event.kind == SPEECH and event.speech_kind == "guidance":
+                        self.metrics.increment("guidance_prompts")
+
+                if session.finished:
+                    return session, True
+
+            # render the most recent detection on top of the newest frame
+            session.render(im_frame)
+
+            if not self._show(im_frame):
+                return session, False
+
+    def _wants_retake(self, voice):
+        """After a picture, give the user a few seconds to ask for another one"""
+        speak("Say retake if you want another one.")
+        deadline = time.time() + VOICE_COMMAND_RETAKE_WINDOW
+        retake = []
+
+        def check_commands(detection):
+            retake.extend(command for command in voice.poll() if command.kind == RETAKE)
+            return bool(retake)
+
+        return self.preview_until(lambda: time.time() >= deadline, on_detection=check_commands) and bool(retake)
+
+    def _save_capture(self, event, target_position):
+        #save the best frame of the hold still window, without any overlays. Encoding and writing happen in the background
+        filename = save_image(event.frame, metadata={
+            "target": target_position,
+            "zone": ZONE_NAMES[event.zone],
+            "face_box": [int(v) for v in event.box],
+            "frame_size": [self.frame_width, self.frame_height],
+            "detector": self.detector_backend,
+            "captured_at": datetime.fromtimestamp(event.t).isoformat(),
+            "session_seconds": round(event.session_time, 3),
+            "hold_seconds": round(event.hold_time, 3),
+        })
+
+        speak("Picture has been clicked and saved")
+        print(f"[INFO] Image saved: {filename}")
+
+
+def main(detector_backend=FACE_DETECTOR_BACKEND, profile_startup=False, source=CAMERA_SOURCE):
+    profile = StartupProfile(profile_startup)
+    profile.mark("imports")
+
+    #everything slow warms up in the background. The microphone goes first: a calibrating recognizer has to be done before the
+    #welcome prompt (get_target_position waits for it), the rest keeps warming up while the prompt plays
+    warm_up_microphone()
+    speech_engine = LazyResource(start_speech_engine, "speech engine").start()
+    camera = LazyResource(lambda: open_camera(source), "camera").start()
+    app_loader = LazyResource(lambda: SelfieApp(detector_backend, profile), "detector and cascades").start()
+    profile.mark("warm-up started")
 
-def main():
     target_position = get_target_position()
-    
-    #Load a pre-trained Haar Cascade classifier to perform face detection
-    face_classifier = cv2.CascadeClassifier(cv2.data.haarcascades +'haarcascade_frontalface_default.xml')
-
-    #Open your camera --- make sure there aren't more than one face as this will trigger multiple detections. The code can handle this, but for your project this will cause an issue.  
-    face_cap = cv2.VideoCapture(0)
-    
-    if not face_cap.isOpened():
-        print("Couldn't open the camera")
-        speak("Sorry, Couldn't open camera at the moment. Please try again later!")
+    profile.mark("target position received")
+
+    app = app_loader.get()
+    face_cap = camera.get()
+    profile.mark("detector and camera ready")
+    for resource in (speech_engine, listener, app_loader, camera):
+        profile.add_resource(resource)
+
+    if not app.open(face_cap):
+        speak("Sorry, Couldn't open camera at the moment. Please try again later!", wait=True)
         return
-    
-    frame_width = int(face_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    frame_height = int(face_cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    
-    cv2.namedWindow('Selfie App', cv2.WINDOW_NORMAL)
-    cv2.setWindowProperty('Selfie App', cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
-
-    has_image_been_captured = False
-    last_guidance_time = time.time() - GUIDANCE_INTERVAL
-    
-    last_detected_quad_coords_of_user= None #if user has been seen or their face has been detected previously in the same session store that so that guidance is given based on this memory
-    user_last_detected_time=0 #tracks the time when users face was last detected
-    
-    offscreen_last_command = "initial" #to know what should be the next command to give to the user should be given based on the last guidance
-    
-    has_countdown_started = False
-    last_countdown_value = None
-    
-    frames_in_target = 0
-    
-    initial_face_detection = False
-    initial_face_detection_start = time.time()
-    
-    #Keep looping until 'q' is pressed to quit or an image has been captured
+
+    session, _ = app.run_session(target_position)
+
+    # Cleanup
+    app.close()
+
+    if not session.has_image_been_captured:
+        speak("Session ended!", wait=True)
+    else:
+        speak("Goodbye!", wait=True)
+
+
+def run_kiosk(detector_backend=FACE_DETECTOR_BACKEND, source=CAMERA_SOURCE):
+    """Serve one user after another without ever closing the camera, detector, speech engine or microphone.
+    A new session starts as soon as a new face shows up, press 'q' to stop the kiosk"""
+    #the microphone calibrates while the camera opens, so the first user doesn't wait for it
+    warm_up_microphone()
+    get_speech_service()
+
+    app = SelfieApp(detector_backend)
+    if not app.open(open_camera(source)):
+        speak("Sorry, Couldn't open camera at the moment. Please try again later!", wait=True)
+        return
+
+    new_users = NewUserDetector()
+    served = 0
+
     while True:
-        #Read a frame from the camera.
-        im_ret, im_frame = face_cap.read()
+        #idle preview until someone new steps up
+        arrival = {}
+
+        def spot_new_user(detection):
+            box = new_users.update(detection.frame, detection.faces, detection.timestamp)
+            if box is not None:
+                arrival["time"] = time.time()
+            return box is not None
 
-        #If im_ret returns an error.
-        if not im_ret:
-            print("Error reading from camera.")
+        if not app.preview_until(lambda: False, on_detection=spot_new_user):
             break
 
-        # make sure the image is not mirrored to avoid confusion in directions
-        im_frame = cv2.flip(im_frame, 1)
-        
-
-        # draw quadrants and center box in the frame for making it easier to visualize where the face of the person is in
-        im_frame = draw_quadrants_and_center_box(im_frame)
-        
-        #maintain a copy of frame so that when image is saved it is saved without the bounding boxes and quadrants
-        copy_of_frame = im_frame.copy()
-        
-        #Perform grayscale conversion for better detection accuracy.
-        gray_frame = cv2.cvtColor(im_frame, cv2.COLOR_BGR2GRAY)
-
-        #Use the face detector on the gray scale or gray_frame.
-        faces = face_classifier.detectMultiScale(gray_frame, scaleFactor=1.1, minNeighbors=10, minSize=(30, 30))
-
-        # keep track of current time
-        current_time = time.time()
-        
-        # give 5 seconds for initial detection before giving guidance
-        if not initial_face_detection:
-            if len(faces) > 0:
-                # face detected
-                initial_face_detection = True
-                user_last_detected_time = current_time
-            elif (current_time - initial_face_detection_start) >= INITIAL_FACE_DETECTION_WAIT_TIME:
-                # face wasn't detected proceed with the guidance
-                initial_face_detection = True
-            else:
-                cv2.imshow('Selfie App', im_frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
-                continue 
-
-        if len(faces) > 0 and not has_image_been_captured:   
-            #choose the largest face
-            faces = sorted(faces, key=lambda f: f[2]*f[3], reverse=True)
-            
-            x, y, w, h = faces[0]
-            
-            #Only draw a bounding box to one face that is the largest face detected
-            cv2.rectangle(im_frame, (x, y), (x + w, y + h), (255, 0, 0), 3)
-            
-            #Draw a circular dot on the center of the face
-            face_center_x_pos = x + w // 2
-            face_center_y_pos = y + h // 2
-            
-            cv2.circle(im_frame, (face_center_x_pos, face_center_y_pos), 5, (0, 0, 255), -1)
-            
-            current_quadrant = get_current_postion_where_the_face_lies(face_center_x_pos, face_center_y_pos, frame_width, frame_height)
-            fully_in_target = is_face_fully_in_target(x, y, w, h, target_position, frame_width, frame_height)
-            
-            print(f"Face in: {current_quadrant}, Target: {target_position}, Fully inside: {fully_in_target}")
-            
-            last_detected_quad_coords_of_user = (x, y, w, h)
-            offscreen_last_command= "initial"
-
-
-            if not fully_in_target:
-                    #if the user is not in the target position guide them towards the target position
-                    has_countdown_started = False
-                    frames_in_target = 0
-
-                    if current_time - last_guidance_time >= GUIDANCE_INTERVAL:
-                        guidance = get_guidance_for_user(current_quadrant, target_position)
-                        speak(guidance)
-                        
-                        last_guidance_time = current_time
-                        
-            else:
-                    # face is in the target position and also facing the camera
-                    frames_in_target += 1
-                    
-                    # when first entering stable zone
-                    if frames_in_target == 1 and not has_countdown_started:
-                        speak("Hold still")
-                        has_countdown_started = True
-                        
-                    remaining_frames = max(REQUIRED_STABLE_FRAMES - frames_in_target, 0)
-                    countdown = int((remaining_frames / max(REQUIRED_STABLE_FRAMES, 1)) * 3) + 1
-                    countdown = min(max(countdown, 1), 3)
-                    
-                    if countdown != last_countdown_value and current_time - last_guidance_time >= 0.9:
-                        speak(str(countdown))
-                        
-                        last_countdown_value = countdown
-                        last_guidance_time = current_time
-                    
-                    cv2.putText(im_frame, f"Hold still... {countdown}", 
-                               (frame_width // 2 - 150, 50),
-                               cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 3)
-                               
-                    
-                    if frames_in_target >= REQUIRED_STABLE_FRAMES:
-                        speak("Perfect! Smile!")
-                        
-                        time.sleep(0.5)
-                        
-                        filename = save_image(copy_of_frame)
-                        
-                        speak("Picture has been clicked and saved")
-                        print(f"[INFO] Image saved: {filename}")
-                        
-                        has_image_been_captured = True
-                        
-                        # short delay then quit loop
-                        time.sleep(1)
-                        break
-                    
+        #ask for the target position on a worker thread so the preview keeps running while we listen
+        print(f"[INFO] New user, first prompt {(time.time() - arrival['time']) * 1000:.0f} ms after they were spotted")
+        answer = {}
+        prompt = threading.Thread(target=lambda: answer.update(target=get_target_position()), name="selfie-target-prompt", daemon=True)
+        prompt.start()
+        if not app.preview_until(lambda: not prompt.is_alive()):
+            break
+
+        session, keep_running = app.run_session(answer["target"], abandon_after=KIOSK_ABANDON_TIME)
+        if session.has_image_been_captured:
+            served += 1
+            new_users.served(session.captured_frame, session.last_detected_quad_coords_of_user)
+            speak("Thank you! Next person please.")
         else:
-            # If face isn't detected or the image has been captured already
-            
-            frames_in_target = 0
-            has_countdown_started = False
-            last_countdown_value = None    
-                    
-            time_since_last_face_was_detected = current_time - user_last_detected_time if user_last_detected_time else None
-            
-            if current_time - last_guidance_time >= GUIDANCE_INTERVAL and not has_image_been_captured:
-                if last_detected_quad_coords_of_user and time_since_last_face_was_detected is not None and time_since_last_face_was_detected <= GUIDANCE_INTERVAL:
-                    lx, ly, lw, lh = last_detected_quad_coords_of_user
-                    
-                    towards_left = lx < (frame_width * EDGE_THRESHOLD)
-                    towards_right = (lx + lw) > (frame_width * (1 - EDGE_THRESHOLD))
-                    towards_top = ly < (frame_height * EDGE_THRESHOLD)
-                    towards_bottom = (ly + lh) > (frame_height * (1 - EDGE_THRESHOLD))
-
-                    if towards_left:
-                        speak("Take one side-step to your right")
-                    elif towards_right:
-                        speak("Take one side-step to your left")
-                    elif towards_top:
-                        speak("Take one step backwards without turning around")
-                    elif towards_bottom:
-                        speak("Take one step forward")
-                    else:
-                        fx = lx + lw // 2
-                        fy = ly + lh // 2
-                        last_q = get_current_postion_where_the_face_lies(fx, fy, frame_width, frame_height)
-                        guidance = get_guidance_for_user(last_q, target_position)
-                        speak("I lost your face ", guidance)
-                        
-                    last_guidance_time = current_time
-                    
-                else:
-                    #Users face hasn't been detected once in this session so just follow a pattern
-                    if offscreen_last_command == "initial":
-                        speak("No face detected yet. Please take two steps back without turning around.")
-                        offscreen_last_command = "step_back"
-                    elif offscreen_last_command == "step_back":
-                        speak("Perfect. Now take two side-steps towards your left side.")
-                        offscreen_last_command = "move_left"
-                        
-                    elif offscreen_last_command == "move_left":
-                        speak("Okay. Now take four side-steps towards your right side.")
-                        offscreen_last_command = "move_right"
-                        
-                    elif offscreen_last_command == "move_closer":
-                        speak("Now take one more step backward without turning around.")
-                        offscreen_last_command = "final_adjust"
-                    else:
-                        speak("Please adjust your position slowly; I’ll keep guiding you.")
-                        offscreen_last_command = "initial"
-                    last_guidance_time = current_time
-                    
-        cv2.imshow('Selfie App', im_frame)
+            #cancelled or abandoned: whoever is in front of the camera now is the user who just gave up
+            detection = app.pipeline.latest_detection()
+            if detection is not None and len(detection.faces) > 0:
+                new_users.served(detection.frame, max(detection.faces, key=lambda f: f[2] * f[3]))
+            else:
+                new_users.served(None, None)
 
-        # Exit on 'q' key
-        if cv2.waitKey(1) & 0xFF == ord('q'):
+        if not keep_running:
             break
-        
-    # Cleanup
-    face_cap.release()
-    cv2.destroyAllWindows()
-    
-    if not has_image_been_captured:
-        speak("Session ended!")
-    else:
-        speak("Goodbye!")
-        
+
+    app.close()
+    print(f"[INFO] Kiosk served {served} users")
+    speak("Session ended!", wait=True)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Selfie camera app for visually impaired people")
+    parser.add_argument("--detector", choices=sorted(DETECTOR_BACKENDS), default=FACE_DETECTOR_BACKEND, help="face detector backend to use")
+    parser.add_argument("--kiosk", action="store_true", help="keep running and serve one user after another")
+    parser.add_argument("--source", default=CAMERA_SOURCE, help="camera index, or a video file, image directory or glob pattern to replay instead")
+    parser.add_argument("--profile-startup", action="store_true", help="print how long each startup phase takes until the first frame is shown")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.kiosk:
+        run_kiosk(detector_backend=args.detector, source=args.source)
+    else:
+        main(detector_backend=args.detector, profile_startup=args.profile_startup, source=args.source)
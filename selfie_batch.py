@@ -0,0 +1,172 @@
+"""Batch face position audit: run the app's face detection, zone classification and facing check over a directory of
+images or videos on all CPU cores, without a camera or display.
+
+    python -m selfie_batch images/ [more files or directories...] --output audit.jsonl
+
+Every image (and every --stride-th frame of every video) becomes one JSON line with its face boxes, the zone each face
+is in, whether it is fully inside each zone (is_face_fully_in_target for every zone) and whether the user faces the camera.
+Lines are written as soon as a file is done, so the order follows completion rather than the file names.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from constant import FACE_DETECTOR_BACKEND, ZONE_LAYOUT
+from utils.detectors import DETECTOR_BACKENDS, create_face_detector, load_cascade
+from utils.view import check_if_user_is_facing_the_camera
+from utils.zones import get_zone_layout
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+# set in every worker process by _init_worker, one detector and eye cascade per process
+_worker = {}
+
+
+def collect_files(paths):
+    """Every image and video in the given files and directories (directories are searched recursively)"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(f for f in glob.glob(os.path.join(path, "**", "*"), recursive=True)
+                                if f.lower().endswith(IMAGE_EXTENSIONS + VIDEO_EXTENSIONS)))
+        elif os.path.isfile(path):
+            files.append(path)
+    return files
+
+
+def _init_worker(backend, layout, mirror):
+    # the processes already use every core, OpenCV's own threads would only fight over them
+    cv2.setNumThreads(1)
+    # plain full frame search for haar, the ROI search assumes consecutive frames of one user
+    detector = create_face_detector(backend, multi_resolution=False) if backend == "haar" else create_face_detector(backend)
+    _worker.update(detector=detector, eye_classifier=load_cascade('haarcascade_eye.xml'), layout=layout, mirror=mirror)
+
+
+def analyze_frame(frame, detector, eye_classifier, layout_name):
+    """Faces in one frame with their zone, per zone containment and facing status"""
+    frame_h, frame_w = frame.shape[:2]
+    layout = get_zone_layout(frame_w, frame_h, layout_name)
+    faces = detector(frame)
+    if not faces:
+        return []
+
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    zones = layout.classify(faces)
+    containment = layout.containment(faces)
+
+    results = []
+    for face, zone, inside in zip(faces, zones, containment):
+        x, y, w, h = (int(v) for v in face)
+        facing, direction = check_if_user_is_facing_the_camera(gray, x, y, w, h, eye_classifier)
+        results.append({
+            "box": [x, y, w, h],
+            "zone": layout.names[zone],
+            "fully_in": {name: bool(value) for name, value in zip(layout.names, inside)},
+            "facing_camera": facing,
+            "facing": direction,
+        })
+    return results
+
+
+def analyze_file(path, stride=15):
+    """JSON records for one file, one per image or per sampled video frame. Runs inside a worker process"""
+    detector, eye_classifier = _worker["detector"], _worker["eye_classifier"]
+    layout, mirror = _worker["layout"], _worker["mirror"]
+    start = time.perf_counter()
+
+    if path.lower().endswith(IMAGE_EXTENSIONS):
+        frames = [(None, cv2.imread(path))]
+    else:
+        frames = _video_frames(path, stride)
+
+    records = []
+    for index, frame in frames:
+        if frame is None:
+            records.append({"file": path, "frame": index, "error": "couldn't read the file"})
+            continue
+        if mirror:
+            frame = cv2.flip(frame, 1)
+        faces = analyze_frame(frame, detector, eye_classifier, layout)
+        records.append({"file": path, "frame": index, "width": frame.shape[1], "height": frame.shape[0], "faces": faces})
+
+    if not records:
+        records.append({"file": path, "frame": None, "error": "no frames"})
+    records[-1]["elapsed_ms"] = round(1000 * (time.perf_counter() - start), 1)
+    return records
+
+
+def _video_frames(path, stride):
+    capture = cv2.VideoCapture(path)
+    index = 0
+    try:
+        while True:
+            # grab() skips frames without decoding them
+            if index % stride == 0:
+                ret, frame = capture.read()
+                if not ret:
+                    return
+                yield index, frame
+            elif not capture.grab():
+                return
+            index += 1
+    finally:
+        capture.release()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="selfie_batch", description="Audit face positions in a directory of selfies or videos")
+    parser.add_argument("paths", nargs="*", default=["images"], help="images, videos or directories (default: images/)")
+    parser.add_argument("--detector", choices=sorted(DETECTOR_BACKENDS), default=FACE_DETECTOR_BACKEND)
+    parser.add_argument("--layout", choices=["quadrants", "thirds"], default=ZONE_LAYOUT, help="zones to classify faces into")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: one per core)")
+    parser.add_argument("--stride", type=int, default=15, help="analyze every n-th video frame")
+    parser.add_argument("--mirror", action="store_true", help="flip frames like the live preview (for raw camera recordings)")
+    parser.add_argument("--output", help="write the JSON lines here instead of stdout")
+    args = parser.parse_args(argv)
+    if args.stride < 1:
+        parser.error("--stride has to be at least 1")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    files = collect_files(args.paths)
+    if not files:
+        print(f"No images or videos found in {', '.join(args.paths)}", file=sys.stderr)
+        return 1
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    start = time.perf_counter()
+    frames = faces = 0
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args.detector, args.layout, args.mirror)) as executor:
+            futures = {executor.submit(analyze_file, path, args.stride): path for path in files}
+            for future in as_completed(futures):
+                try:
+                    records = future.result()
+                except Exception as e:
+                    records = [{"file": futures[future], "frame": None, "error": str(e)}]
+                for record in records:
+                    output.write(json.dumps(record) + "\n")
+                    frames += "faces" in record
+                    faces += len(record.get("faces", ()))
+                output.flush()
+    finally:
+        if args.output:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"{len(files)} files, {frames} frames, {faces} faces in {elapsed:.1f}s ({frames / elapsed:.1f} frames/s on {args.workers} workers)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""Offline benchmark: replay recorded clips through the selfie detection and SelfieSession decision logic without a camera or display.
+
+    python -m selfie_bench clip.mp4 [more clips or directories...] --target center --output bench.json
+
+A video file is one clip. A directory of images is replayed as one clip of consecutive frames, or with --per-image
+every image becomes its own short panning clip (handy for the selfies in images/). The JSON report can be diffed
+between builds, a short human readable summary goes to stderr.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import time
+
+import cv2
+
+from benchmarks.clips import synthetic_clip_from_image
+from constant import FACE_DETECTOR_BACKEND, SMILE_CAPTURE_DELAY, SMILE_CAPTURE_WINDOW, STABLE_HOLD_TIME, USE_FACE_TRACKING
+from utils.detectors import DETECTOR_BACKENDS, create_face_detector
+from utils.session import CAPTURE, HOLD_STILL_PROMPT, SPEECH, SelfieSession
+from utils.tracker import DetectThenTrack
+
+CLIP_MARGIN_S = 8 #still images become clips this much longer than the hold and the smile window, so there is time to hold still and get captured
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+TARGETS = ["top-left", "top-right", "bottom-left", "bottom-right", "center"]
+
+
+def peak_memory_mb():
+    """High-water mark of the process resident memory, None where the resource module isn't available"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macOS bytes
+    return max_rss / (1024 * 1024) if platform.system() == "Darwin" else max_rss / 1024
+
+
+def percentiles(values):
+    if not values:
+        return None
+    values = sorted(values)
+
+    def pick(pct):
+        return round(values[min(int(len(values) * pct / 100), len(values) - 1)], 3)
+
+    return {"p50": pick(50), "p90": pick(90), "p95": pick(95), "p99": pick(99), "max": round(values[-1], 3),
+            "mean": round(sum(values) / len(values), 3), "count": len(values)}
+
+
+def read_video(path):
+    capture = cv2.VideoCapture(path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = []
+    while True:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames, fps
+
+
+def iter_clips(paths, per_image, fps):
+    """(name, frames, fps) for every clip found in the given paths. Clips are loaded one at a time when they're asked for,
+    so only the clip being replayed is in memory (frames can be empty when a file couldn't be read)"""
+    clip_frames = int(fps * (STABLE_HOLD_TIME + SMILE_CAPTURE_DELAY + SMILE_CAPTURE_WINDOW + CLIP_MARGIN_S))
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(glob.glob(os.path.join(path, "*")))
+            images = [f for f in files if f.lower().endswith(IMAGE_EXTENSIONS)]
+            videos = [f for f in files if f.lower().endswith(VIDEO_EXTENSIONS)]
+
+            for video in videos:
+                yield (os.path.basename(video), *read_video(video))
+
+            if images and per_image:
+                for image_path in images:
+                    yield os.path.basename(image_path), synthetic_clip_from_image(cv2.imread(image_path), clip_frames), fps
+            elif images:
+                yield os.path.basename(os.path.normpath(path)), [cv2.imread(f) for f in images], fps
+
+        elif path.lower().endswith(IMAGE_EXTENSIONS):
+            yield os.path.basename(path), synthetic_clip_from_image(cv2.imread(path), clip_frames), fps
+        else:
+            yield (os.path.basename(path), *read_video(path))
+
+
+def replay_clip(frames, fps, detect, target_position, mirror=True, smoothing=True):
+    """Run one clip through detection and a SelfieSession, exactly the decisions selfie_app.main makes.
+    Time is simulated from the clip frame rate so results don't depend on how fast this machine is.
+    smoothing=False turns the face box filter and the zone hysteresis off, to compare against the raw detector boxes"""
+    stages = {"flip": [], "detect": [], "decision": [], "frame": []}
+    frame_h, frame_w = frames[0].shape[:2]
+    session = SelfieSession(target_position, (frame_w, frame_h), detector=detect, clock=lambda: 0.0, verbose=False)
+    if not smoothing:
+        session.smoother = None
+        session.zone_hysteresis = 0
+    events = []
+    faces_seen = 0
+
+    start = time.perf_counter()
+    for index, frame in enumerate(frames):
+        frame_start = time.perf_counter()
+
+        if mirror:
+            frame = cv2.flip(frame, 1)
+        t0 = time.perf_counter()
+        faces = detect(frame)
+        t1 = time.perf_counter()
+        events.extend(session.step(frame, index / fps, faces=faces))
+        t2 = time.perf_counter()
+
+        faces_seen += len(faces) > 0
+        stages["flip"].append(1000 * (t0 - frame_start))
+        stages["detect"].append(1000 * (t1 - t0))
+        stages["decision"].append(1000 * (t2 - t1))
+        stages["frame"].append(1000 * (t2 - frame_start))
+
+        if session.finished:
+            break
+
+    elapsed = time.perf_counter() - start
+    processed = len(stages["frame"])
+    capture = next((event for event in events if event.kind == CAPTURE), None)
+
+    return {
+        "frames": len(frames),
+        "frames_processed": processed,
+        "frames_with_face": faces_seen,
+        "processing_fps": round(processed / elapsed, 2) if elapsed > 0 else None,
+        "captured": capture is not None,
+        "time_to_capture_s": round(capture.t, 3) if capture is not None else None,
+        "countdown_starts": sum(1 for event in events if event.kind == SPEECH and event.text == HOLD_STILL_PROMPT),
+        "cpu_ms": round(sum(stages["frame"]), 1), #processing time of all the frames until the capture
+        "guidance_prompts": sum(1 for event in events if event.kind == SPEECH and event.speech_kind == "guidance"),
+        "stages_ms": {name: percentiles(values) for name, values in stages.items()},
+    }
+
+
+def build_detector(backend, tracking):
+    detector = create_face_detector(backend)
+    return DetectThenTrack(detector) if tracking else detector
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="selfie_bench", description="Replay recorded clips through the selfie app logic headlessly")
+    parser.add_argument("paths", nargs="*", default=["images"], help="video files, images or directories (default: images/)")
+    parser.add_argument("--target", choices=TARGETS, default="center", help="target position the user is guided towards")
+    parser.add_argument("--detector", choices=sorted(DETECTOR_BACKENDS), default=FACE_DETECTOR_BACKEND)
+    parser.add_argument("--no-tracking", action="store_true", help="run the full detector on every frame")
+    parser.add_argument("--per-image", action="store_true", help="turn every image into its own panning clip instead of one frame sequence")
+    parser.add_argument("--fps", type=float, default=30.0, help="frame rate assumed for image sequences")
+    parser.add_argument("--no-smoothing", action="store_true", help="decide on the raw detector boxes, without the box filter and zone hysteresis")
+    parser.add_argument("--no-mirror", action="store_true", help="don't flip frames like the live camera preview does")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    tracking = USE_FACE_TRACKING and not args.no_tracking
+    # memory is reported over what the interpreter and the imports already take
+    baseline_memory = peak_memory_mb()
+
+    results = []
+    for name, frames, fps in iter_clips(args.paths, args.per_image, args.fps):
+        if not frames:
+            continue
+        # a fresh detector per clip so tracking state doesn't leak between clips
+        result = replay_clip(frames, fps, build_detector(args.detector, tracking), args.target, mirror=not args.no_mirror,
+                             smoothing=not args.no_smoothing)
+        result["clip"] = name
+        result["frames_mb"] = round(sum(frame.nbytes for frame in frames) / (1024 * 1024), 1)
+        results.append(result)
+        del frames #released before the next clip is loaded
+
+        ttc = f"{result['time_to_capture_s']:.2f}s" if result["captured"] else "no capture"
+        print(f"{name}: {result['frames_processed']}/{result['frames']} frames, {result['processing_fps']} fps, "
+              f"detect p50 {result['stages_ms']['detect']['p50']} ms, {ttc}", file=sys.stderr)
+
+    if not results:
+        print(f"No clips found in {', '.join(args.paths)}", file=sys.stderr)
+        return 1
+
+    captured = [r["time_to_capture_s"] for r in results if r["captured"]]
+    captured_results = [r for r in results if r["captured"]]
+    peak_memory = peak_memory_mb()
+    report = {
+        "config": {
+            "detector": args.detector,
+            "tracking": tracking,
+            "smoothing": not args.no_smoothing,
+            "target": args.target,
+            "stable_hold_time_s": STABLE_HOLD_TIME,
+            "mirror": not args.no_mirror,
+            "opencv": cv2.__version__,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "clips": results,
+        "summary": {
+            "clips": len(results),
+            "captured": len(captured),
+            "time_to_capture_s": percentiles(captured),
+            "frames_to_capture": percentiles([r["frames_processed"] for r in captured_results]),
+            "cpu_ms_to_capture": percentiles([r["cpu_ms"] for r in captured_results]),
+            "mean_processing_fps": round(sum(r["processing_fps"] or 0 for r in results) / len(results), 2),
+            "baseline_memory_mb": round(baseline_memory, 1) if baseline_memory is not None else None,
+            "peak_memory_over_baseline_mb": round(peak_memory - baseline_memory, 1) if peak_memory is not None else None,
+        },
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
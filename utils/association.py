@@ -0,0 +1,134 @@
+import math
+
+import numpy as np
+
+from constant import ASSOCIATION_CENTROID_WEIGHT, ASSOCIATION_MAX_COST, ASSOCIATION_MAX_MISSES
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """(len(a) x len(b)) intersection over union of every pair of (x, y, w, h) boxes"""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    left = np.maximum(a[:, None, 0], b[None, :, 0])
+    top = np.maximum(a[:, None, 1], b[None, :, 1])
+    right = np.minimum(a[:, None, 0] + a[:, None, 2], b[None, :, 0] + b[None, :, 2])
+    bottom = np.minimum(a[:, None, 1] + a[:, None, 3], b[None, :, 1] + b[None, :, 3])
+    intersection = np.clip(right - left, 0, None) * np.clip(bottom - top, 0, None)
+    union = (a[:, 2] * a[:, 3])[:, None] + (b[:, 2] * b[:, 3])[None, :] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-6), 0.0)
+
+
+def centroid_distance_matrix(boxes_a, boxes_b):
+    """(len(a) x len(b)) distance between box centers, in units of the a box's size so it means the same near and far from the camera"""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    a_centers = a[:, :2] + a[:, 2:] / 2
+    b_centers = b[:, :2] + b[:, 2:] / 2
+    distance = np.linalg.norm(a_centers[:, None, :] - b_centers[None, :, :], axis=2)
+    return distance / np.maximum(np.sqrt(a[:, 2] * a[:, 3]), 1.0)[:, None]
+
+
+def match_cost(track_box, box, centroid_weight=ASSOCIATION_CENTROID_WEIGHT):
+    """Match cost of one track and one detection, the same as FaceAssociator's matrices without numpy's overhead"""
+    ax, ay, aw, ah = track_box
+    bx, by, bw, bh = box
+    intersection = max(min(ax + aw, bx + bw) - max(ax, bx), 0) * max(min(ay + ah, by + bh) - max(ay, by), 0)
+    union = aw * ah + bw * bh - intersection
+    iou = intersection / max(union, 1e-6) if union > 0 else 0.0
+    distance = math.hypot(ax + aw / 2 - (bx + bw / 2), ay + ah / 2 - (by + bh / 2)) / max(math.sqrt(aw * ah), 1.0)
+    return (1 - iou) + centroid_weight * distance
+
+
+class FaceTrack:
+    """One person followed across frames"""
+
+    def __init__(self, track_id, box, t):
+        self.track_id = track_id
+        self.box = box
+        self.first_seen = t
+        self.last_seen = t
+        self.hits = 1
+        self.misses = 0 #frames in a row without a matching detection
+
+
+class FaceAssociator:
+    """Matches the faces found on every frame to the people seen on the previous ones, and locks onto the primary user.
+
+    The match cost of a track and a detection is (1 - IoU) + centroid_weight * centroid distance (in face sizes), pairs are
+    matched greedily from the cheapest and pairs costing more than max_cost never match. Unmatched detections start new tracks,
+    tracks missing for more than max_misses frames are dropped. The primary track is the biggest face when there is none yet,
+    and stays the primary however big other faces get until it is dropped, so a bystander walking behind the user is ignored.
+    """
+
+    def __init__(self, centroid_weight=ASSOCIATION_CENTROID_WEIGHT, max_cost=ASSOCIATION_MAX_COST, max_misses=ASSOCIATION_MAX_MISSES):
+        self.centroid_weight = centroid_weight
+        self.max_cost = max_cost
+        self.max_misses = max_misses
+        self.tracks = []
+        self.primary_id = None
+        self._next_id = 1
+
+    def reset(self):
+        self.tracks = []
+        self.primary_id = None
+
+    @property
+    def primary(self):
+        return next((track for track in self.tracks if track.track_id == self.primary_id), None)
+
+    def _cheapest_pairs(self, boxes):
+        """(track index, box index) of the pairs that may match, cheapest first"""
+        if not self.tracks or not boxes:
+            return []
+        if len(self.tracks) == 1 and len(boxes) == 1:
+            # the usual case of one user in front of the camera, numpy's overhead would be most of the step's time
+            return [(0, 0)] if match_cost(self.tracks[0].box, boxes[0], self.centroid_weight) <= self.max_cost else []
+
+        track_boxes = [track.box for track in self.tracks]
+        cost = (1 - iou_matrix(track_boxes, boxes)) + self.centroid_weight * centroid_distance_matrix(track_boxes, boxes)
+        # greedy assignment, cheapest pairs first. With a handful of faces this is as good as the Hungarian algorithm
+        pairs = []
+        for flat in np.argsort(cost, axis=None):
+            track_index, box_index = divmod(int(flat), len(boxes))
+            if cost[track_index, box_index] > self.max_cost:
+                break
+            pairs.append((track_index, box_index))
+        return pairs
+
+    def update(self, faces, t=0.0):
+        """Feed the faces found on a frame. Returns the primary user's box if they were found on this frame, None otherwise"""
+        boxes = [tuple(int(v) for v in face) for face in faces]
+        matched_tracks, matched_boxes = set(), set()
+
+        for track_index, box_index in self._cheapest_pairs(boxes):
+            if track_index in matched_tracks or box_index in matched_boxes:
+                continue
+            track = self.tracks[track_index]
+            track.box = boxes[box_index]
+            track.last_seen = t
+            track.hits += 1
+            track.misses = 0
+            matched_tracks.add(track_index)
+            matched_boxes.add(box_index)
+
+        for track_index, track in enumerate(self.tracks):
+            if track_index not in matched_tracks:
+                track.misses += 1
+        self.tracks = [track for track in self.tracks if track.misses <= self.max_misses]
+
+        for box_index, box in enumerate(boxes):
+            if box_index not in matched_boxes:
+                self.tracks.append(FaceTrack(self._next_id, box, t))
+                self._next_id += 1
+
+        primary = self.primary
+        if primary is None and self.tracks:
+            # nobody locked on yet (or the user left): take the biggest face seen on this frame
+            visible = [track for track in self.tracks if track.misses == 0]
+            if visible:
+                primary = max(visible, key=lambda track: track.box[2] * track.box[3])
+                self.primary_id = primary.track_id
+        if primary is None:
+            self.primary_id = None
+            return None
+        return primary.box if primary.misses == 0 else None
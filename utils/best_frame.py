@@ -0,0 +1,79 @@
+import cv2
+import numpy as np
+
+from constant import BEST_FRAME_BUFFER_SIZE, BEST_FRAME_EYE_CHECK_WIDTH
+from utils.view import check_if_user_is_facing_the_camera
+
+
+def sharpness_score(gray_face):
+    """Variance of the Laplacian, low values mean a blurry (moving) face"""
+    return cv2.Laplacian(gray_face, cv2.CV_64F).var()
+
+
+class BestFrameBuffer:
+    """Keeps the best few clean frames seen while the user is holding still, so the saved picture isn't the blurry or mid-blink one
+    that happened to be current when the countdown ended.
+
+    Frames are copied into a pool of preallocated numpy arrays (allocated once per resolution), so adding a frame never allocates
+    a new frame array. When the pool is full a new frame only goes in if it scores better than the worst one kept.
+    Frames where both eyes are found (check_if_user_is_facing_the_camera) always beat frames where they aren't.
+    """
+
+    def __init__(self, size=BEST_FRAME_BUFFER_SIZE, eye_classifier=None):
+        self.size = size
+        self.eye_classifier = eye_classifier
+        self._pool = None
+        self._scores = [None] * size
+        self._boxes = [None] * size
+        self.count = 0
+
+    def reset(self):
+        self._scores = [None] * self.size
+        self._boxes = [None] * self.size
+        self.count = 0
+
+    def _score(self, frame, box, eyes_open=None):
+        x, y, w, h = box
+        face = frame[max(y, 0):y + h, max(x, 0):x + w]
+        if face.size == 0:
+            return (False, 0.0)
+        gray_face = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+
+        # eyes_open is passed in when the caller already checked the eyes on this frame (see utils.facing)
+        if eyes_open is None:
+            eyes_open = False
+            if self.eye_classifier is not None:
+                # a shrunk face finds the same eyes for a fraction of the cost
+                scale = min(BEST_FRAME_EYE_CHECK_WIDTH / w, 1.0)
+                small_face = cv2.resize(gray_face, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                eyes_open, _ = check_if_user_is_facing_the_camera(small_face, 0, 0, small_face.shape[1], small_face.shape[0], self.eye_classifier)
+        return (eyes_open, sharpness_score(gray_face))
+
+    def add(self, frame, box, eyes_open=None):
+        """Score the frame and keep it if it's one of the best so far. Returns the score.
+        Pass eyes_open when the eyes were already checked on this frame so the eye cascade doesn't run twice"""
+        if self._pool is None or self._pool.shape[1:] != frame.shape:
+            self._pool = np.empty((self.size,) + frame.shape, dtype=frame.dtype)
+            self.reset()
+
+        score = self._score(frame, box, eyes_open)
+
+        if self.count < self.size:
+            slot = self.count
+            self.count += 1
+        else:
+            slot = min(range(self.size), key=lambda i: self._scores[i])
+            if score <= self._scores[slot]:
+                return score
+
+        np.copyto(self._pool[slot], frame)
+        self._scores[slot] = score
+        self._boxes[slot] = box
+        return score
+
+    def best(self):
+        """(frame, box, score) of the best frame kept, the frame is a copy so the pool can keep being reused. None when empty"""
+        if self.count == 0:
+            return None
+        slot = max(range(self.count), key=lambda i: self._scores[i])
+        return self._pool[slot].copy(), self._boxes[slot], self._scores[slot]
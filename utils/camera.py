@@ -0,0 +1,211 @@
+import glob
+import os
+import time
+
+import cv2
+
+from constant import CAMERA_BUFFER_SIZE, CAMERA_FOURCC, CAMERA_FPS, CAMERA_HEIGHT, CAMERA_REPLAY_FPS, CAMERA_SOURCE, CAMERA_WIDTH
+from utils.metrics import get_metrics
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+MAX_DRIVER_FRAME_AGE_MS = 2000 #driver timestamps claiming an older frame than this aren't on our clock (some backends use another one)
+
+
+def fourcc_to_str(value):
+    value = int(value)
+    return "".join(chr((value >> 8 * i) & 0xFF) for i in range(4)).strip("\x00") if value > 0 else ""
+
+
+class CameraSetting:
+    """One capture property we asked the driver for and what it reports back"""
+
+    def __init__(self, name, requested, actual, accepted):
+        self.name = name
+        self.requested = requested
+        self.actual = actual
+        self.accepted = accepted #what set() returned, the only hint for properties the driver can't read back
+
+    @property
+    def honored(self):
+        if self.actual in (None, "", 0, -1):
+            return self.accepted
+        if isinstance(self.requested, str):
+            return self.actual == self.requested
+        return abs(self.actual - self.requested) < 0.5
+
+    def __repr__(self):
+        status = "ok" if self.honored else "NOT honored"
+        actual = "unknown" if self.actual in (None, "", 0, -1) else self.actual
+        return f"{self.name} {self.requested} -> {actual} ({status})"
+
+
+def negotiate(capture, width=CAMERA_WIDTH, height=CAMERA_HEIGHT, fps=CAMERA_FPS, fourcc=CAMERA_FOURCC, buffer_size=CAMERA_BUFFER_SIZE):
+    """Ask an opened camera for a format and read back what it actually gives us. Settings that are 0 or empty are left alone.
+
+    The order matters on most drivers: the pixel format decides which resolutions and frame rates are available,
+    so it goes first, then the resolution, then the frame rate. Returns a list of CameraSetting.
+    """
+    settings = []
+
+    def request(name, prop, requested, value, read_back):
+        accepted = capture.set(prop, value)
+        settings.append(CameraSetting(name, requested, read_back(capture.get(prop)), accepted))
+
+    if fourcc:
+        request("fourcc", cv2.CAP_PROP_FOURCC, fourcc, cv2.VideoWriter_fourcc(*fourcc), fourcc_to_str)
+    if width:
+        request("width", cv2.CAP_PROP_FRAME_WIDTH, width, width, int)
+    if height:
+        request("height", cv2.CAP_PROP_FRAME_HEIGHT, height, height, int)
+    if fps:
+        request("fps", cv2.CAP_PROP_FPS, fps, fps, lambda v: round(v, 2))
+    if buffer_size:
+        #fewer frames waiting in the driver means the frame we read is the one taken just now rather than a few frames ago
+        request("buffer size", cv2.CAP_PROP_BUFFERSIZE, buffer_size, buffer_size, int)
+    return settings
+
+
+class ImageSequenceCapture:
+    """cv2.VideoCapture look-alike over a list of image files, so the app can run without a camera"""
+
+    def __init__(self, files, fps=CAMERA_REPLAY_FPS):
+        self.files = list(files)
+        self.fps = fps
+        self.index = 0
+        first = cv2.imread(self.files[0]) if self.files else None
+        self.frame_size = (first.shape[1], first.shape[0]) if first is not None else (0, 0)
+
+    def isOpened(self):
+        return self.index < len(self.files) and self.frame_size[0] > 0
+
+    def read(self):
+        while self.index < len(self.files):
+            frame = cv2.imread(self.files[self.index])
+            self.index += 1
+            if frame is not None:
+                #the app assumes every frame has the size of the first one
+                if (frame.shape[1], frame.shape[0]) != self.frame_size:
+                    frame = cv2.resize(frame, self.frame_size)
+                return True, frame
+        return False, None
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.frame_size[0]
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.frame_size[1]
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self.files)
+        return 0
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self.index = len(self.files)
+
+
+def image_files(source):
+    """Images of a directory or glob pattern in name order, empty when source is neither"""
+    if os.path.isdir(source):
+        pattern = os.path.join(source, "*")
+    elif glob.has_magic(source):
+        pattern = source
+    else:
+        return []
+    return [file for file in sorted(glob.glob(pattern)) if file.lower().endswith(IMAGE_EXTENSIONS)]
+
+
+class CameraCapture:
+    """Where the frames come from: a camera opened with the format from constant.py, or a video file / image sequence replayed
+    at its own frame rate (realtime=False reads it as fast as possible).
+
+    Drop-in replacement for cv2.VideoCapture. read() also sets timestamp (time.time() of when the frame was taken: the driver's
+    buffer timestamp when the backend has one on our clock, else when read() returned) and frame_age (milliseconds the frame
+    spent in the driver before we got it, None when unknown), so the latency from the camera to the screen can be measured.
+    """
+
+    def __init__(self, source=CAMERA_SOURCE, width=CAMERA_WIDTH, height=CAMERA_HEIGHT, fps=CAMERA_FPS, fourcc=CAMERA_FOURCC,
+                 buffer_size=CAMERA_BUFFER_SIZE, realtime=True):
+        self.source = source
+        self.settings = []
+        self.timestamp = None
+        self.frame_age = None
+        self.frames_read = 0
+
+        files = image_files(source) if isinstance(source, str) else []
+        if files:
+            self.live = False
+            self.capture = ImageSequenceCapture(files)
+        elif isinstance(source, int) or str(source).isdigit():
+            self.live = True
+            self.capture = cv2.VideoCapture(int(source))
+            if self.capture.isOpened():
+                self.settings = negotiate(self.capture, width, height, fps, fourcc, buffer_size)
+        else:
+            self.live = False
+            self.capture = cv2.VideoCapture(source)
+
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or CAMERA_REPLAY_FPS
+        self._pace = not self.live and realtime
+        self._replay_start = None
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def get(self, prop):
+        return self.capture.get(prop)
+
+    def set(self, prop, value):
+        return self.capture.set(prop, value)
+
+    def release(self):
+        self.capture.release()
+
+    def read(self):
+        if self._pace:
+            #a recording plays at the speed it was filmed, like a camera would deliver it
+            if self._replay_start is None:
+                self._replay_start = time.time()
+            wait = self._replay_start + self.frames_read / self.fps - time.time()
+            if wait > 0:
+                time.sleep(wait)
+
+        ret, frame = self.capture.read()
+        now = time.time()
+        if not ret:
+            return ret, frame
+        self.frames_read += 1
+
+        self.frame_age = self._driver_frame_age() if self.live else None
+        self.timestamp = now - self.frame_age / 1000 if self.frame_age is not None else now
+        if self.frame_age is not None:
+            get_metrics().observe("frame_age", self.frame_age)
+        return ret, frame
+
+    def _driver_frame_age(self):
+        #V4L2 and a few other backends report the buffer timestamp on the monotonic clock through CAP_PROP_POS_MSEC
+        driver_ms = self.capture.get(cv2.CAP_PROP_POS_MSEC)
+        if driver_ms <= 0:
+            return None
+        age = time.monotonic() * 1000 - driver_ms
+        return age if 0 <= age < MAX_DRIVER_FRAME_AGE_MS else None
+
+    def describe(self):
+        """One line saying what we asked for and what we got, for the log"""
+        width, height = int(self.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if not self.live:
+            return f"replaying {self.source} at {width}x{height}, {self.fps:g} fps"
+        if not self.settings:
+            return f"camera {self.source} at {width}x{height} with driver defaults"
+        return f"camera {self.source}: " + ", ".join(map(repr, self.settings))
+
+
+def open_capture(source=CAMERA_SOURCE, **kwargs):
+    """Open the frame source and log which of the requested camera settings the driver honored"""
+    capture = CameraCapture(source, **kwargs)
+    if capture.isOpened():
+        print(f"[INFO] Capture: {capture.describe()}")
+    return capture
@@ -0,0 +1,112 @@
+import cv2
+
+from constant import DETECTION_DOWNSCALE, DETECTION_MIN_WIDTH, DETECTION_ROI_MARGIN, DETECTION_ROI_MAX_SIZE_RATIO, DETECTION_ROI_MIN_SIZE_RATIO
+
+
+def count_cascade_windows(image_w, image_h, window_size, scale_factor, min_size=(0, 0), max_size=(0, 0)):
+    """Number of windows a cascade classifier checks with detectMultiScale, following the scale pyramid and step that OpenCV uses"""
+    window_w, window_h = window_size
+    windows = 0
+    factor = 1.0
+
+    while True:
+        scaled_window_w, scaled_window_h = int(round(window_w * factor)), int(round(window_h * factor))
+        scaled_w, scaled_h = int(round(image_w / factor)), int(round(image_h / factor))
+
+        if scaled_w < window_w or scaled_h < window_h:
+            break
+        if max_size[0] and (scaled_window_w > max_size[0] or scaled_window_h > max_size[1]):
+            break
+
+        if scaled_window_w >= min_size[0] and scaled_window_h >= min_size[1]:
+            step = 1 if factor > 2 else 2
+            windows += ((scaled_w - window_w) // step + 1) * ((scaled_h - window_h) // step + 1)
+
+        factor *= scale_factor
+
+    return windows
+
+
+class MultiResolutionDetector:
+    """Haar face detection that avoids searching the full camera resolution.
+
+    Without a known face it runs the cascade on a shrunk frame (see scale_for) and maps the boxes back to full resolution.
+    Once a face has been found it only searches an area DETECTION_ROI_MARGIN around the last box, for faces of about the same size,
+    and falls back to the whole frame when the face is missed there. When the shrunk frame has no face either, the full resolution
+    frame is searched before giving up, small faces can be lost in the shrunk one.
+    candidates_evaluated holds how many cascade windows the last call checked, last_search which search found the faces.
+    """
+
+    def __init__(self, face_classifier, downscale=DETECTION_DOWNSCALE, min_width=DETECTION_MIN_WIDTH, roi_margin=DETECTION_ROI_MARGIN,
+                 scale_factor=1.1, min_neighbors=10, min_size=(30, 30)):
+        self.face_classifier = face_classifier
+        self.downscale = downscale
+        self.min_width = min_width
+        self.roi_margin = roi_margin
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+
+        window_size = face_classifier.getOriginalWindowSize()
+        self.window_size = (int(window_size[0]), int(window_size[1])) if window_size else (24, 24)
+
+        self.last_box = None
+        self.last_search = None
+        self.candidates_evaluated = 0
+
+    def scale_for(self, frame_width):
+        """Factor a frame this wide is shrunk by: down to downscale, but never below min_width pixels wide"""
+        return min(1.0, max(self.downscale, self.min_width / max(frame_width, 1)))
+
+    def __call__(self, gray_frame):
+        self.candidates_evaluated = 0
+        scale = self.scale_for(gray_frame.shape[1])
+
+        if self.last_box is not None:
+            faces = self._search_around_last_face(gray_frame, scale)
+            if len(faces) > 0:
+                self.last_search = "roi"
+                return self._remember(faces)
+
+        self.last_search = "full"
+        min_size = (int(self.min_size[0] * scale), int(self.min_size[1] * scale))
+        faces = self._detect_scaled(gray_frame, 0, 0, min_size, (0, 0), scale)
+        if len(faces) == 0 and scale < 1:
+            self.last_search = "full resolution"
+            faces = self._detect_scaled(gray_frame, 0, 0, self.min_size, (0, 0), 1.0)
+        return self._remember(faces)
+
+    def reset(self):
+        self.last_box = None
+
+    def _remember(self, faces):
+        self.last_box = max(faces, key=lambda f: f[2] * f[3]) if len(faces) > 0 else None
+        return faces
+
+    def _search_around_last_face(self, gray_frame, scale):
+        frame_h, frame_w = gray_frame.shape[:2]
+        x, y, w, h = self.last_box
+        margin_x, margin_y = int(w * self.roi_margin), int(h * self.roi_margin)
+
+        x0, y0 = max(x - margin_x, 0), max(y - margin_y, 0)
+        x1, y1 = min(x + w + margin_x, frame_w), min(y + h + margin_y, frame_h)
+
+        # only look for faces roughly as big as the one we saw last time
+        face_size = min(w, h) * scale
+        min_size = (int(face_size * DETECTION_ROI_MIN_SIZE_RATIO),) * 2
+        max_size = (int(face_size * DETECTION_ROI_MAX_SIZE_RATIO),) * 2
+
+        return self._detect_scaled(gray_frame[y0:y1, x0:x1], x0, y0, min_size, max_size, scale)
+
+    def _detect_scaled(self, gray, offset_x, offset_y, min_size, max_size, scale):
+        if scale != 1:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        height, width = gray.shape[:2]
+        self.candidates_evaluated += count_cascade_windows(width, height, self.window_size, self.scale_factor, min_size, max_size)
+
+        faces = self.face_classifier.detectMultiScale(gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors,
+                                                      minSize=min_size, maxSize=max_size)
+
+        # map the boxes back to full resolution frame coordinates
+        return [(offset_x + int(fx / scale), offset_y + int(fy / scale), int(fw / scale), int(fh / scale)) for (fx, fy, fw, fh) in faces]
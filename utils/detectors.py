@@ -0,0 +1,210 @@
+import os
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from constant import (DNN_INPUT_WIDTH, DNN_SCORE_THRESHOLD, ONNX_MODEL_PATH, SSD_MODEL_PATH, SSD_PROTOTXT_PATH,
+                      USE_MULTI_RESOLUTION_DETECTION, YUNET_MODEL_PATH)
+from utils.detection import MultiResolutionDetector
+from utils.metrics import get_metrics
+
+
+def to_gray(frame):
+    if frame.ndim == 2:
+        return frame
+    with get_metrics().time("gray"):
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+@lru_cache(maxsize=None)
+def load_cascade(filename):
+    """Haar cascade from OpenCV's data directory (or a path), parsed once per process.
+    A cascade isn't safe to run from two threads at once, keep each cached one on a single thread"""
+    path = filename if os.path.isfile(filename) else cv2.data.haarcascades + filename
+    classifier = cv2.CascadeClassifier(path)
+    if classifier.empty():
+        raise FileNotFoundError(f"Couldn't load the cascade {path}")
+    return classifier
+
+
+def _check_model_file(path):
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"Face detector model not found at {path}. See the README for where to download it.")
+
+
+class FaceDetector:
+    """Common interface for all face detector backends.
+
+    detect(frame) takes a BGR (or grayscale) frame and returns a list of (x, y, w, h) boxes in frame coordinates.
+    Detectors are callable so they can be used anywhere a detect(frame) function is expected.
+    """
+
+    name = "base"
+    grayscale = False #detect() only needs the grayscale frame, callers that have one already can pass it and save the conversion
+
+    def detect(self, frame):
+        raise NotImplementedError
+
+    def reset(self):
+        """Forget what was found on earlier frames, before feeding unrelated images"""
+
+    def detect_batch(self, frames):
+        return [self.detect(frame) for frame in frames]
+
+    def __call__(self, frame):
+        return self.detect(frame)
+
+
+class HaarFaceDetector(FaceDetector):
+    """The original OpenCV Haar cascade, optionally with the downscaled/ROI search from utils.detection"""
+
+    name = "haar"
+    grayscale = True
+
+    def __init__(self, cascade_path=None, multi_resolution=USE_MULTI_RESOLUTION_DETECTION):
+        self.face_classifier = load_cascade(cascade_path or 'haarcascade_frontalface_default.xml')
+        self.search = MultiResolutionDetector(self.face_classifier) if multi_resolution else None
+
+    def detect(self, frame):
+        gray = to_gray(frame)
+        if self.search is not None:
+            return self.search(gray)
+        return [tuple(int(v) for v in face) for face in self.face_classifier.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=10, minSize=(30, 30))]
+
+    def reset(self):
+        if self.search is not None:
+            self.search.reset()
+
+
+class YuNetFaceDetector(FaceDetector):
+    """OpenCV's cv2.FaceDetectorYN (YuNet). The network is loaded once and the frame is shrunk to DNN_INPUT_WIDTH before inference"""
+
+    name = "yunet"
+
+    def __init__(self, model_path=YUNET_MODEL_PATH, score_threshold=DNN_SCORE_THRESHOLD, input_width=DNN_INPUT_WIDTH):
+        _check_model_file(model_path)
+        self.input_width = input_width
+        self.detector = cv2.FaceDetectorYN.create(model_path, "", (input_width, input_width), score_threshold, 0.3, 5000)
+        self._input_size = None
+
+    def detect(self, frame):
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+
+        scale = min(self.input_width / frame.shape[1], 1.0)
+        small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else frame
+
+        input_size = (small.shape[1], small.shape[0])
+        if input_size != self._input_size:
+            self.detector.setInputSize(input_size)
+            self._input_size = input_size
+
+        _, faces = self.detector.detect(small)
+        if faces is None:
+            return []
+        return [tuple(int(v / scale) for v in face[:4]) for face in faces]
+
+
+class SsdFaceDetector(FaceDetector):
+    """res10 300x300 SSD face detector through cv2.dnn. Batches go through the network in a single forward pass"""
+
+    name = "ssd"
+
+    def __init__(self, prototxt_path=SSD_PROTOTXT_PATH, model_path=SSD_MODEL_PATH, score_threshold=DNN_SCORE_THRESHOLD):
+        _check_model_file(prototxt_path)
+        _check_model_file(model_path)
+        self.net = cv2.dnn.readNetFromCaffe(prototxt_path, model_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.score_threshold = score_threshold
+
+    def detect(self, frame):
+        return self.detect_batch([frame])[0]
+
+    def detect_batch(self, frames):
+        frames = [cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR) if frame.ndim == 2 else frame for frame in frames]
+        blob = cv2.dnn.blobFromImages(frames, 1.0, (300, 300), (104.0, 177.0, 123.0))
+        self.net.setInput(blob)
+
+        # every row is [image index, label, score, x1, y1, x2, y2] with coordinates between 0 and 1
+        detections = self.net.forward().reshape(-1, 7)
+        results = [[] for _ in frames]
+
+        for image_index, _, score, x1, y1, x2, y2 in detections[detections[:, 2] >= self.score_threshold]:
+            height, width = frames[int(image_index)].shape[:2]
+            x1, y1 = max(int(x1 * width), 0), max(int(y1 * height), 0)
+            x2, y2 = min(int(x2 * width), width), min(int(y2 * height), height)
+            if x2 > x1 and y2 > y1:
+                results[int(image_index)].append((x1, y1, x2 - x1, y2 - y1))
+
+        return results
+
+
+class OnnxFaceDetector(FaceDetector):
+    """Any ONNX face detector with (scores, boxes) outputs run on CPU with onnxruntime, e.g. the Ultra-Light-Fast-Generic-Face-Detector models.
+
+    scores is [batch, anchors, 2] (background, face) and boxes is [batch, anchors, 4] corners between 0 and 1.
+    The onnxruntime session is created once. Models with a dynamic batch dimension get whole batches in one run.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path=ONNX_MODEL_PATH, score_threshold=DNN_SCORE_THRESHOLD):
+        _check_model_file(model_path)
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("The onnx face detector needs onnxruntime, install it with: pip install onnxruntime") from e
+
+        self.session = onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch, _, self.input_height, self.input_width = model_input.shape
+        self.supports_batches = not isinstance(batch, int) or batch > 1
+        self.score_threshold = score_threshold
+
+    def detect(self, frame):
+        return self.detect_batch([frame])[0]
+
+    def detect_batch(self, frames):
+        if not self.supports_batches and len(frames) > 1:
+            return [self.detect_batch([frame])[0] for frame in frames]
+
+        blob = np.stack([self._preprocess(frame) for frame in frames])
+        scores, boxes = self.session.run(None, {self.input_name: blob})
+        return [self._postprocess(frame, frame_scores[:, 1], frame_boxes) for frame, frame_scores, frame_boxes in zip(frames, scores, boxes)]
+
+    def _preprocess(self, frame):
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        image = cv2.cvtColor(cv2.resize(frame, (self.input_width, self.input_height)), cv2.COLOR_BGR2RGB)
+        return ((image.astype(np.float32) - 127.0) / 128.0).transpose(2, 0, 1)
+
+    def _postprocess(self, frame, scores, boxes):
+        height, width = frame.shape[:2]
+        keep = scores >= self.score_threshold
+        if not np.any(keep):
+            return []
+
+        boxes = boxes[keep] * np.array([width, height, width, height], dtype=np.float32)
+        rects = np.column_stack([boxes[:, 0], boxes[:, 1], boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]])
+        indices = cv2.dnn.NMSBoxes(rects.tolist(), scores[keep].tolist(), self.score_threshold, 0.3)
+        return [tuple(int(v) for v in rects[i]) for i in np.array(indices).flatten()]
+
+
+DETECTOR_BACKENDS = {
+    HaarFaceDetector.name: HaarFaceDetector,
+    YuNetFaceDetector.name: YuNetFaceDetector,
+    SsdFaceDetector.name: SsdFaceDetector,
+    OnnxFaceDetector.name: OnnxFaceDetector,
+}
+
+
+def create_face_detector(backend, **kwargs):
+    """Build a face detector by name (see DETECTOR_BACKENDS)"""
+    try:
+        detector_class = DETECTOR_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown face detector '{backend}', choose from: {', '.join(DETECTOR_BACKENDS)}") from None
+    return detector_class(**kwargs)
@@ -0,0 +1,57 @@
+import cv2
+
+from constant import BEST_FRAME_EYE_CHECK_WIDTH, FACING_CHECK_CACHE_FRAMES, FACING_CHECK_EYE_REGION, STABLE_MAX_JITTER_PX
+from utils.view import check_if_user_is_facing_the_camera
+
+
+class FacingCheck:
+    """check_if_user_is_facing_the_camera made cheap enough to run while the user holds still.
+
+    The eye cascade only looks at the top of the face (FACING_CHECK_EYE_REGION) shrunk to BEST_FRAME_EYE_CHECK_WIDTH pixels,
+    and a result is reused for cache_frames frames as long as the face hasn't moved more than max_move pixels.
+    update() returns (facing, direction) with direction "center", "rotate_left", "rotate_right" or "no_eyes_detected".
+    """
+
+    def __init__(self, eye_classifier, cache_frames=FACING_CHECK_CACHE_FRAMES, eye_region=FACING_CHECK_EYE_REGION,
+                 check_width=BEST_FRAME_EYE_CHECK_WIDTH, max_move=STABLE_MAX_JITTER_PX):
+        self.eye_classifier = eye_classifier
+        self.cache_frames = cache_frames
+        self.eye_region = eye_region
+        self.check_width = check_width
+        self.max_move = max_move
+        self.checks = 0 #how many times the cascade actually ran, for benchmarks
+        self.reset()
+
+    def reset(self):
+        self.result = None
+        self._box = None
+        self._age = 0
+
+    def update(self, frame, box):
+        """Facing status of the face at box, from the cache when it's recent enough"""
+        if self.result is not None and self._age < self.cache_frames and self._close_to(box):
+            self._age += 1
+            return self.result
+
+        self.result = self._check(frame, box)
+        self._box = box
+        self._age = 1
+        return self.result
+
+    def _close_to(self, box):
+        x, y, w, h = box
+        lx, ly, lw, lh = self._box
+        return abs(x + w / 2 - lx - lw / 2) <= self.max_move and abs(y + h / 2 - ly - lh / 2) <= self.max_move
+
+    def _check(self, frame, box):
+        x, y, w, h = box
+        face = frame[max(y, 0):y + int(h * self.eye_region), max(x, 0):x + w]
+        if face.size == 0:
+            return (False, "no_eyes_detected")
+        self.checks += 1
+
+        gray_face = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY) if face.ndim == 3 else face
+        scale = min(self.check_width / w, 1.0)
+        small_face = cv2.resize(gray_face, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        # the thresholds inside are relative to the whole face, so pass the full (scaled) face height even though only the top is there
+        return check_if_user_is_facing_the_camera(small_face, 0, 0, small_face.shape[1], int(h * scale), self.eye_classifier)
@@ -0,0 +1,56 @@
+from utils.zones import ZONE_NAMES, Zone
+
+# Guidance mapping based on where the user is currently and where the user needs to go towards, indexed by Zone
+ZONE_OFFSETS = (
+    (-1, -1), # top-left
+    (1, -1), # top-right
+    (-1, 1), # bottom-left
+    (1, 1), # bottom-right
+    (0, 0), # center
+)
+
+def as_zone(position):
+    """Zone for a Zone id or a position name, unknown names are treated like the center"""
+    if isinstance(position, str):
+        return Zone(ZONE_NAMES.index(position)) if position in ZONE_NAMES else Zone.CENTER
+    return Zone(position)
+
+def get_guidance_for_user(current_position, target_position):
+    # positions are Zone ids, names like "top-left" are still accepted
+    current_position = as_zone(current_position)
+    target_position = as_zone(target_position)
+    cx, cy = ZONE_OFFSETS[current_position]
+    tx, ty = ZONE_OFFSETS[target_position]
+    dx = tx - cx
+    dy = ty - cy
+    parts = []
+    if dy < 0:
+        parts.append("one step forward")
+    elif dy > 0:
+        parts.append("one step back without turning around")
+    if dx < 0:
+        parts.append("one side-step to your left")
+    elif dx > 0:
+        parts.append("one side-step to your right")
+    if not parts:
+        # in case of current position and target position is same but the face is not fully inside the position/quadrant. so just try to move a user to take them out of this edge case. this is not the perfect solution but it just does the job of taking user out of this weird position
+        if current_position == Zone.TOP_LEFT:
+            return "Take one side-step to your left and one step forward"
+        elif current_position == Zone.TOP_RIGHT:
+            return "Take one side-step to your right and one step forward"
+        elif current_position == Zone.BOTTOM_RIGHT:
+            return "Take one side-step to your right and one step back without turning around"
+        elif current_position == Zone.BOTTOM_LEFT:
+            return "Take one side-step to your left and one step back without turning around"
+        else:
+            return "Take one side-step to your right"
+    return "Take " + " and ".join(parts)
+# Guidance for the results of check_if_user_is_facing_the_camera. The preview is mirrored, so eyes towards the left of the face box mean the head is turned to the user's left
+FACING_GUIDANCE = {
+    "rotate_left": "Turn your head slightly to the right",
+    "rotate_right": "Turn your head slightly to the left",
+    "no_eyes_detected": "Please look straight at the camera",
+}
+
+def get_facing_guidance(direction):
+    return FACING_GUIDANCE.get(direction, FACING_GUIDANCE["no_eyes_detected"])
@@ -0,0 +1,73 @@
+import time
+
+import cv2
+
+from constant import KIOSK_NEW_USER_TIME, KIOSK_SAME_USER_SIMILARITY, KIOSK_USER_GONE_TIME
+
+
+def face_signature(frame, box):
+    """Cheap appearance fingerprint of a face: a normalized hue/saturation histogram of the face crop"""
+    x, y, w, h = box
+    face = frame[max(y, 0):y + h, max(x, 0):x + w]
+    if face.size == 0:
+        return None
+    hsv = cv2.cvtColor(cv2.resize(face, (32, 32), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2HSV)
+    histogram = cv2.calcHist([hsv], [0, 1], None, [16, 8], [0, 180, 0, 256])
+    return cv2.normalize(histogram, histogram).flatten()
+
+
+class NewUserDetector:
+    """Tells when a new person has stepped up to the kiosk.
+
+    A face counts as a new user once it has been seen for KIOSK_NEW_USER_TIME seconds and either nobody was in front
+    of the camera for KIOSK_USER_GONE_TIME seconds before, or it looks different from the last user served
+    (so someone stepping in right behind the previous person still gets their own session, while the person who just took
+    a picture and is still standing there doesn't get greeted again).
+    """
+
+    def __init__(self, new_user_time=KIOSK_NEW_USER_TIME, user_gone_time=KIOSK_USER_GONE_TIME, same_user_similarity=KIOSK_SAME_USER_SIMILARITY):
+        self.new_user_time = new_user_time
+        self.user_gone_time = user_gone_time
+        self.same_user_similarity = same_user_similarity
+        self.last_user_signature = None
+        self.last_face_time = None
+        self.face_since = None
+        self.area_was_empty = True
+
+    def served(self, frame, box, t=None):
+        """Remember who was just served at time t (time.time(), like the detection timestamps) so lingering in front of the camera
+        doesn't start another session. Without a frame and box the previous user's signature is kept"""
+        signature = face_signature(frame, box) if frame is not None and box is not None else None
+        if signature is not None:
+            self.last_user_signature = signature
+        #update() isn't fed during the session, so the user counts as seen right up to now
+        self.last_face_time = time.time() if t is None else t
+        self.area_was_empty = False
+        self.face_since = None
+
+    def update(self, frame, faces, t):
+        """Feed the latest detection. Returns the face box of a new user, or None"""
+        if len(faces) == 0:
+            self.face_since = None
+            if self.last_face_time is None or t - self.last_face_time >= self.user_gone_time:
+                self.area_was_empty = True
+            return None
+
+        self.last_face_time = t
+        if self.face_since is None:
+            self.face_since = t
+        if t - self.face_since < self.new_user_time:
+            return None
+
+        box = max(faces, key=lambda f: f[2] * f[3])
+        if self.area_was_empty or self._looks_like_someone_else(frame, box):
+            return box
+        return None
+
+    def _looks_like_someone_else(self, frame, box):
+        if self.last_user_signature is None:
+            return True
+        signature = face_signature(frame, box)
+        if signature is None:
+            return False
+        return cv2.compareHist(self.last_user_signature, signature, cv2.HISTCMP_CORREL) < self.same_user_similarity
@@ -0,0 +1,176 @@
+import bisect
+import json
+import threading
+import time
+
+from constant import LOG_EVERY_FRAME, METRICS_ENABLED
+from utils.storage import write_atomically
+
+# histogram bucket upper bounds, in milliseconds for the stage timers and in seconds for whole sessions
+STAGE_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 33, 66, 100, 250, 500, 1000, 2500)
+SESSION_BUCKETS_S = (1, 2, 3, 4, 5, 7.5, 10, 15, 20, 30, 45, 60, 120)
+
+_frame_logging = LOG_EVERY_FRAME
+
+
+def set_frame_logging(enabled):
+    """Turn the per-frame console prints ("Face in: ...") on or off, they cost real time at 30 fps"""
+    global _frame_logging
+    _frame_logging = enabled
+
+
+def frame_logging_enabled():
+    return _frame_logging
+
+
+class Histogram:
+    """Fixed bucket histogram (like a Prometheus one), cheap enough to update on every frame from any thread"""
+
+    def __init__(self, buckets=STAGE_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) #the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = None
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        """Estimated from the buckets (upper bound of the bucket holding the q-th value), None when empty.
+        Past the last bucket it's the largest value observed, so it stays finite (JSON has no Infinity)"""
+        with self._lock:
+            if self.count == 0:
+                return None
+            rank = q * self.count
+            seen = 0
+            for bound, count in zip(self.buckets, self.counts):
+                seen += count
+                if seen >= rank:
+                    return bound
+            return self.max
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+
+class _StageTimer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe((time.perf_counter() - self.start) * 1000)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """Stage timers, histograms and counters of the selfie loop.
+
+    with metrics.time("detect"): ... records how long a stage took in milliseconds. Stages show up in the order they are first
+    recorded: capture, flip, gray, detect, overlay, decision, display, latency (capture to display) and tts from the app,
+    frame_age (how long a frame waited in the camera driver) when the camera reports it and tts_first_audio (from picking up
+    an utterance to its cached clip playing).
+    Counters count things like captures and guidance prompts. Everything can be read back as a HUD, Prometheus text or JSON.
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self.histograms = {}
+        self.counters = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def histogram(self, name, buckets=STAGE_BUCKETS_MS):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram(buckets))
+        return histogram
+
+    def time(self, stage):
+        """Context manager timing a stage, does nothing when metrics are off"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self.histogram(stage))
+
+    def observe(self, name, value, buckets=STAGE_BUCKETS_MS):
+        if self.enabled:
+            self.histogram(name, buckets).observe(value)
+
+    def increment(self, name, amount=1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def hud_lines(self):
+        """One short line per stage for the on-screen HUD: mean and p95 in milliseconds"""
+        lines = []
+        for name, histogram in list(self.histograms.items()):
+            if histogram.buckets == STAGE_BUCKETS_MS and histogram.count:
+                lines.append(f"{name:<9} mean {histogram.mean:6.1f} ms  p95 <{histogram.quantile(0.95):g} ms")
+        return lines
+
+    def to_json(self):
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "counters": dict(self.counters),
+            "histograms": {
+                name: {"count": h.count, "mean": round(h.mean, 3) if h.count else None, "p50": h.quantile(0.5), "p95": h.quantile(0.95),
+                       "p99": h.quantile(0.99), "buckets": dict(zip([*map(str, h.buckets), "+Inf"], h.counts))}
+                for name, h in list(self.histograms.items())
+            },
+        }
+
+    def to_prometheus(self):
+        """Prometheus text exposition format, e.g. for the node exporter textfile collector"""
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            metric = f"selfie_{name}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+
+        for name, h in list(self.histograms.items()):
+            unit = "milliseconds" if h.buckets == STAGE_BUCKETS_MS else "seconds"
+            metric = f"selfie_{name}_{unit}"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, count in zip([*map(str, h.buckets), "+Inf"], h.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines += [f"{metric}_sum {h.sum:.3f}", f"{metric}_count {h.count}"]
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """Write the metrics to path, as JSON for .json files and Prometheus text otherwise"""
+        data = json.dumps(self.to_json(), indent=2) if path.endswith(".json") else self.to_prometheus()
+        write_atomically(path, data.encode())
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    """The process wide metrics every stage reports to"""
+    return _metrics
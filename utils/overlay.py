@@ -0,0 +1,40 @@
+import cv2
+import numpy as np
+
+from utils.view import draw_quadrants_and_center_box
+
+
+class OverlayCompositor:
+    """Puts the quadrant grid and center box on display frames without redrawing them every frame.
+
+    The grid never changes for a given resolution, so it is drawn once with draw_quadrants_and_center_box on a blank
+    canvas and cached together with a mask of the pixels it covers. Compositing is then a copy of the clean frame into
+    a reusable display buffer plus one masked copy of the layer. The clean frame itself is never touched, so the detector
+    and the saved picture never see the grid.
+    """
+
+    def __init__(self, draw=draw_quadrants_and_center_box):
+        self.draw = draw
+        self._layers = {}
+        self._display_buffers = {}
+
+    def _layer(self, shape):
+        layer = self._layers.get(shape)
+        if layer is None:
+            canvas = self.draw(np.zeros(shape, dtype=np.uint8))
+            mask = canvas.any(axis=2).astype(np.uint8)
+            layer = (canvas, mask)
+            self._layers[shape] = layer
+        return layer
+
+    def compose(self, frame, out=None):
+        """Clean frame + grid into out (or a display buffer reused for this resolution). Returns the display frame"""
+        if out is None:
+            out = self._display_buffers.get(frame.shape)
+            if out is None:
+                out = self._display_buffers[frame.shape] = np.empty_like(frame)
+
+        np.copyto(out, frame)
+        canvas, mask = self._layer(frame.shape)
+        cv2.copyTo(canvas, mask, out)
+        return out
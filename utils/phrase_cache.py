@@ -0,0 +1,303 @@
+"""Synthesized speech for the phrases the app says over and over, so they play straight away instead of being synthesized every time.
+
+    python -m utils.phrase_cache      synthesizes every phrase a session can say ahead of time (e.g. at install time)
+"""
+import hashlib
+import os
+import platform
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from constant import TTS_PHRASE_CACHE_DIR, TTS_PHRASE_CACHE_MAX_MB, TTS_PRECOMPUTE_PHRASES
+from utils.metrics import get_metrics
+
+
+def reachable_phrases():
+    """Every utterance a selfie session can produce, the ones heard most first"""
+    from utils.guidance import FACING_GUIDANCE, get_guidance_for_user
+    from utils.session import EDGE_PROMPTS, HOLD_STILL_PROMPT, LOST_FACE_PROMPT, OFFSCREEN_FALLBACK_PROMPT, OFFSCREEN_PROMPTS, SMILE_PROMPT
+    from utils.zones import Zone
+
+    guidance = list(dict.fromkeys(get_guidance_for_user(current, target) for target in Zone for current in Zone))
+    return list(dict.fromkeys([
+        HOLD_STILL_PROMPT, "3", "2", "1", SMILE_PROMPT,
+        *guidance,
+        *FACING_GUIDANCE.values(),
+        *EDGE_PROMPTS.values(),
+        *(prompt for _, prompt in OFFSCREEN_PROMPTS.values()), OFFSCREEN_FALLBACK_PROMPT,
+        *(LOST_FACE_PROMPT.format(guidance=text) for text in guidance),
+    ]))
+
+
+def phrase_key(text, voice, rate):
+    return hashlib.sha1(f"{voice}|{rate}|{text}".encode()).hexdigest()
+
+
+class PhraseCache:
+    """Synthesized phrases as WAV files in a directory, keyed by phrase_key(text, voice, rate).
+
+    The least recently used files are deleted once they take more than max_bytes. A file's modification time is its last use,
+    so the cache and its order survive restarts.
+    """
+
+    def __init__(self, directory=TTS_PHRASE_CACHE_DIR, max_bytes=TTS_PHRASE_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() #key -> file size, least recently used first
+
+        os.makedirs(directory, exist_ok=True)
+        files = [entry for entry in os.scandir(directory) if entry.name.endswith(".wav") and not entry.name.startswith(".")]
+        for entry in sorted(files, key=lambda entry: entry.stat().st_mtime):
+            self._entries[entry.name[:-len(".wav")]] = entry.stat().st_size
+        self.total_bytes = sum(self._entries.values())
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".wav")
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Path of the cached clip, None when it isn't cached"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            #deleted behind our back
+            self._forget(key)
+            return None
+        return path
+
+    def add(self, key, synthesize):
+        """Store the clip synthesize(path) writes. It's written under a hidden name first so a half written file is never played"""
+        path = self.path(key)
+        partial = os.path.join(self.directory, "." + key + ".wav")
+        try:
+            synthesize(partial)
+            size = os.path.getsize(partial)
+            if size == 0:
+                raise IOError(f"nothing was synthesized for {key}")
+            os.replace(partial, path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+
+        with self._lock:
+            self.total_bytes += size - self._entries.get(key, 0)
+            self._entries[key] = size
+            self._entries.move_to_end(key)
+            evicted = self._evict()
+        for old_key in evicted:
+            try:
+                os.remove(self.path(old_key))
+            except OSError:
+                pass
+        return path
+
+    def _evict(self):
+        evicted = []
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            evicted.append(key)
+        return evicted
+
+    def _forget(self, key):
+        with self._lock:
+            self.total_bytes -= self._entries.pop(key, 0)
+
+
+def read_wav(path):
+    """(int16 samples x channels, sample rate) of a 16 bit WAV file"""
+    with wave.open(path, "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"{path} isn't 16 bit audio")
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16).reshape(-1, wav.getnchannels())
+        return samples, wav.getframerate()
+
+
+class SoundDevicePlayer:
+    """Plays clips through PortAudio from memory with a low latency output. Decoded clips are kept for the next time they're played"""
+
+    def __init__(self, max_clips=64):
+        import sounddevice
+        self._sounddevice = sounddevice
+        self._clips = OrderedDict()
+        self.max_clips = max_clips
+
+    def start(self, path):
+        clip = self._clips.get(path)
+        if clip is None:
+            clip = self._clips[path] = read_wav(path)
+            if len(self._clips) > self.max_clips:
+                self._clips.popitem(last=False)
+        self._clips.move_to_end(path)
+        samples, rate = clip
+        self._sounddevice.play(samples, rate, latency="low")
+
+    def wait(self):
+        self._sounddevice.wait()
+
+    def stop(self):
+        self._sounddevice.stop()
+
+
+class WinsoundPlayer:
+    """Windows' built-in player, the file is played asynchronously and wait() sleeps for its length"""
+
+    def __init__(self):
+        import winsound
+        self._winsound = winsound
+        self._ends_at = 0.0
+
+    def start(self, path):
+        with wave.open(path, "rb") as wav:
+            duration = wav.getnframes() / wav.getframerate()
+        self._winsound.PlaySound(path, self._winsound.SND_FILENAME | self._winsound.SND_ASYNC | self._winsound.SND_NODEFAULT)
+        self._ends_at = time.monotonic() + duration
+
+    def wait(self):
+        remaining = self._ends_at - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def stop(self):
+        self._winsound.PlaySound(None, 0)
+        self._ends_at = 0.0
+
+
+class CommandPlayer:
+    """A command line player (afplay, paplay, aplay), used when sounddevice isn't installed"""
+
+    def __init__(self, command):
+        self.command = command
+        self._process = None
+
+    def start(self, path):
+        self._process = subprocess.Popen([*self.command, path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def wait(self):
+        if self._process is not None:
+            self._process.wait()
+
+    def stop(self):
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+
+
+def create_player(system=None):
+    """Lowest latency audio player available, None when there is none"""
+    system = system or platform.system()
+    try:
+        return SoundDevicePlayer()
+    except (ImportError, OSError): #OSError when the PortAudio library itself is missing
+        pass
+
+    if system == "Windows":
+        return WinsoundPlayer()
+    commands = [["afplay"]] if system == "Darwin" else [["paplay"], ["aplay", "-q"]]
+    for command in commands:
+        if shutil.which(command[0]):
+            return CommandPlayer(command)
+    return None
+
+
+class CachedPhraseEngine:
+    """Wraps a TTS engine that can synthesize to a file: cached phrases are played straight from their clip, other phrases are
+    spoken by the engine as before and then synthesized into the cache for the next time.
+
+    The synthesizing happens in idle_work(), which the speech service calls on its own thread whenever nothing is queued,
+    so engines that have to be driven from one thread (pyttsx3) keep working and nothing waits on it.
+    """
+
+    def __init__(self, engine, cache, player, precompute=()):
+        self.engine = engine
+        self.cache = cache
+        self.player = player
+        self.voice = f"{type(engine).__name__}:{getattr(engine, 'voice', None) or 'default'}"
+        self.rate = getattr(engine, "rate", None) or "default"
+        self._to_synthesize = deque(precompute)
+
+    def key(self, text):
+        return phrase_key(text, self.voice, self.rate)
+
+    def speak(self, text):
+        start = time.perf_counter()
+        path = self.cache.get(self.key(text))
+        if path is not None:
+            try:
+                self.player.start(path)
+                get_metrics().observe("tts_first_audio", (time.perf_counter() - start) * 1000)
+                self.player.wait()
+                return
+            except Exception as e:
+                print("TTS Error", e)
+
+        self.engine.speak(text)
+        self._to_synthesize.append(text)
+
+    def stop(self):
+        self.player.stop()
+        self.engine.stop()
+
+    def idle_work(self):
+        """Synthesize one phrase that isn't cached yet. Returns False when there is nothing left to do"""
+        while self._to_synthesize:
+            text = self._to_synthesize.popleft()
+            key = self.key(text)
+            if key in self.cache:
+                continue
+            try:
+                self.cache.add(key, lambda path: self.engine.synthesize(text, path))
+            except Exception as e:
+                print("TTS cache Error", e)
+            return True
+        return False
+
+
+def create_cached_engine(engine):
+    """engine wrapped with the phrase cache, None when there is no audio player to play the clips with"""
+    player = create_player()
+    if player is None:
+        return None
+    return CachedPhraseEngine(engine, PhraseCache(), player, reachable_phrases() if TTS_PRECOMPUTE_PHRASES else ())
+
+
+def main():
+    from utils.tts import create_platform_engine
+
+    engine = create_platform_engine()
+    if not hasattr(engine, "synthesize"):
+        print("No text to speech engine to synthesize the phrases with")
+        return
+    cached = CachedPhraseEngine(engine, PhraseCache(), player=None, precompute=reachable_phrases())
+    start = time.perf_counter()
+    while cached.idle_work():
+        pass
+    print(f"{len(cached.cache)} phrases cached in {cached.cache.directory} ({cached.cache.total_bytes / 1024:.0f} KB) "
+          f"in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
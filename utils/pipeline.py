@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from utils.metrics import get_metrics
+
+
+class FpsCounter:
+    """Rolling frames-per-second counter for a single pipeline stage"""
+
+    def __init__(self, window=30):
+        self._ticks = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def tick(self, timestamp=None):
+        with self._lock:
+            self._ticks.append(time.perf_counter() if timestamp is None else timestamp)
+
+    @property
+    def fps(self):
+        with self._lock:
+            if len(self._ticks) < 2:
+                return 0.0
+            elapsed = self._ticks[-1] - self._ticks[0]
+            return (len(self._ticks) - 1) / elapsed if elapsed > 0 else 0.0
+
+
+class LatestFrameBuffer:
+    """Bounded ring buffer of the newest frames. Readers always get the most recent frame, older frames that nobody picked up are simply overwritten (dropped) instead of piling up in a queue"""
+
+    def __init__(self, size=2):
+        self._slots = deque(maxlen=max(size, 1))
+        self._condition = threading.Condition()
+        self._seq = 0
+        self._closed = False
+
+    def put(self, frame, timestamp):
+        with self._condition:
+            self._seq += 1
+            self._slots.append((self._seq, frame, timestamp))
+            self._condition.notify_all()
+            return self._seq
+
+    def get_latest(self, after_seq=0, timeout=None):
+        """Wait for a frame newer than after_seq and return (seq, frame, timestamp), or None on timeout/close"""
+        with self._condition:
+            has_new_frame = self._condition.wait_for(lambda: self._closed or self._seq > after_seq, timeout)
+            if not has_new_frame or not self._slots or self._seq <= after_seq:
+                return None
+            return self._slots[-1]
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class DetectionResult:
+    """Faces found on one captured frame. The frame is kept so that the image we save is the exact one the decision was made on"""
+
+    def __init__(self, seq, timestamp, frame, faces):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.frame = frame
+        self.faces = faces
+
+
+class FramePipeline:
+    """Capture -> detect -> render pipeline.
+
+    The capture thread reads from the camera as fast as it delivers and keeps only the newest frames,
+    the detector thread always works on the latest frame and publishes its result, and the caller (render stage)
+    overlays whatever detection is most recent. A slow detector therefore lowers the detection rate only, not the preview rate.
+    """
+
+    def __init__(self, capture, detect, buffer_size=2, mirror=True):
+        self.capture = capture
+        self.detect = detect
+        self.mirror = mirror
+        self.frames = LatestFrameBuffer(buffer_size)
+
+        self.capture_fps = FpsCounter()
+        self.detect_fps = FpsCounter()
+        self.render_fps = FpsCounter()
+        self.dropped_frames = 0
+        self.capture_failed = False
+
+        self._latest_detection = None
+        self._detection_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="selfie-capture", daemon=True),
+            threading.Thread(target=self._detect_loop, name="selfie-detect", daemon=True),
+        ]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        self.frames.close()
+        for thread in self._threads:
+            if thread.is_alive():
+                thread.join(timeout=2)
+
+    @property
+    def running(self):
+        return not self._stop_event.is_set()
+
+    def _capture_loop(self):
+        metrics = get_metrics()
+        while not self._stop_event.is_set():
+            with metrics.time("capture"):
+                ret, frame = self.capture.read()
+            if not ret:
+                print("Error reading from camera.")
+                self.capture_failed = True
+                self.frames.close()
+                return
+
+            # make sure the image is not mirrored to avoid confusion in directions
+            if self.mirror:
+                with metrics.time("flip"):
+                    frame = cv2.flip(frame, 1)
+
+            #sources from utils.camera know when the frame was actually taken, which may be before read() returned
+            self.frames.put(frame, getattr(self.capture, "timestamp", None) or time.time())
+            self.capture_fps.tick()
+
+    def _detect_loop(self):
+        metrics = get_metrics()
+        last_seq = 0
+        while not self._stop_event.is_set():
+            packet = self.frames.get_latest(last_seq, timeout=0.5)
+            if packet is None:
+                if self.capture_failed:
+                    return
+                continue
+
+            seq, frame, timestamp = packet
+            if last_seq:
+                self.dropped_frames += seq - last_seq - 1
+            last_seq = seq
+
+            with metrics.time("detect"):
+                faces = self.detect(frame)
+
+            with self._detection_lock:
+                self._latest_detection = DetectionResult(seq, timestamp, frame, faces)
+            self.detect_fps.tick()
+
+    def next_frame(self, after_seq=0, timeout=1.0):
+        """Render stage: newest captured frame after after_seq as (seq, frame, timestamp)"""
+        packet = self.frames.get_latest(after_seq, timeout)
+        if packet is not None:
+            self.render_fps.tick()
+        return packet
+
+    def latest_detection(self):
+        with self._detection_lock:
+            return self._latest_detection
+
+    def stage_fps(self):
+        return {
+            "capture": self.capture_fps.fps,
+            "detect": self.detect_fps.fps,
+            "render": self.render_fps.fps,
+        }
+
+    def fps_report(self):
+        fps = self.stage_fps()
+        return f"capture {fps['capture']:.1f} fps | detect {fps['detect']:.1f} fps | render {fps['render']:.1f} fps"
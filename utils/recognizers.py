@@ -0,0 +1,221 @@
+import importlib.util
+import json
+import os
+import time
+import wave
+from contextlib import closing
+
+from constant import (LISTEN_TIMEOUT, PHRASE_TIME_LIMIT, RECOGNIZER_CHUNK_MS, RECOGNIZER_OPERATION_TIMEOUT, RECOGNIZER_SAMPLE_RATE,
+                      SPEECH_RECOGNIZER_BACKEND, VALID_POSITIONS, VOSK_MODEL_PATH)
+
+
+def _silent(*args, **kwargs):
+    pass
+
+
+def find_phrase(text, phrases):
+    """First of phrases said in text, None if there isn't any"""
+    for phrase in phrases:
+        if phrase in text:
+            return phrase
+    return None
+
+
+class MicrophoneStream:
+    """Raw 16 bit mono audio from the default microphone, in small chunks, for the streaming recognizers"""
+
+    def __init__(self, sample_rate=RECOGNIZER_SAMPLE_RATE, chunk_ms=RECOGNIZER_CHUNK_MS):
+        import speech_recognition as sr
+        self.sample_rate = sample_rate
+        self.chunk_size = int(sample_rate * chunk_ms / 1000)
+        self.microphone = sr.Microphone(sample_rate=sample_rate, chunk_size=self.chunk_size)
+
+    def chunks(self):
+        with self.microphone as source:
+            while True:
+                yield source.stream.read(self.chunk_size)
+
+
+class WavFileStream:
+    """Stand-in for the microphone that plays a 16 bit mono WAV file, to test and benchmark recognizers without a microphone.
+    With realtime the chunks come at the speed they would come from a microphone, otherwise as fast as they are read"""
+
+    def __init__(self, path, chunk_ms=RECOGNIZER_CHUNK_MS, realtime=False):
+        self.path = path
+        self.chunk_ms = chunk_ms
+        self.realtime = realtime
+        with wave.open(path, "rb") as wav:
+            if wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+                raise ValueError(f"{path} has to be 16 bit mono")
+            self.sample_rate = wav.getframerate()
+            self.duration = wav.getnframes() / self.sample_rate
+        self.chunk_size = int(self.sample_rate * chunk_ms / 1000)
+
+    def chunks(self):
+        with wave.open(self.path, "rb") as wav:
+            while True:
+                data = wav.readframes(self.chunk_size)
+                if not data:
+                    return
+                if self.realtime:
+                    time.sleep(self.chunk_ms / 1000)
+                yield data
+
+
+class SpeechRecognizer:
+    """Common interface for the speech recognition backends.
+
+    listen(phrases) waits for the user to say something and returns what was heard in lower case, or None when
+    nothing was heard or understood. Streaming backends return as soon as one of phrases is heard instead of waiting
+    for the end of the sentence, and can be given a WavFileStream as their audio source instead of the microphone.
+    vocabulary holds extra words they should understand that don't end listening on their own (e.g. "change to").
+    """
+
+    name = "base"
+    streaming = False
+    offline = False #recognizes on this machine, nothing the microphone hears is sent anywhere
+    calibrates = False #listens to the room's background noise while it's built, so nothing else should be playing then
+
+    def listen(self, phrases=VALID_POSITIONS, timeout=LISTEN_TIMEOUT, phrase_time_limit=PHRASE_TIME_LIMIT, on_partial=None, vocabulary=(), verbose=True):
+        raise NotImplementedError
+
+
+class GoogleSpeechRecognizer(SpeechRecognizer):
+    """Google's web speech API through speech_recognition, what the app always used. Needs a network connection"""
+
+    name = "google"
+    calibrates = True
+
+    def __init__(self):
+        import speech_recognition as sr
+        self.sr = sr
+        self.recognizer = sr.Recognizer()
+        self.recognizer.operation_timeout = RECOGNIZER_OPERATION_TIMEOUT
+        self.microphone = sr.Microphone()
+
+        # calibrating takes a couple of seconds, it happens once when the backend is built
+        with self.microphone as source:
+            self.recognizer.adjust_for_ambient_noise(source, duration=1.5)
+
+    def listen(self, phrases=VALID_POSITIONS, timeout=LISTEN_TIMEOUT, phrase_time_limit=PHRASE_TIME_LIMIT, on_partial=None, vocabulary=(), verbose=True):
+        log = print if verbose else _silent
+        with self.microphone as source:
+            log("[LISTENING...]")
+
+            try:
+                audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
+            except self.sr.WaitTimeoutError:
+                log("[No speech detected]")
+                return None
+
+        # the microphone is free again while Google works on the audio
+        try:
+            log("[PROCESSING]")
+            command = self.recognizer.recognize_google(audio).lower()
+            log(f"[USER]: {command}")
+            return command
+        except self.sr.UnknownValueError:
+            log("[COULD NOT UNDERSTAND]")
+            return None
+        except self.sr.RequestError as e:
+            print(f"[ERROR]: {e}")
+            return None
+
+
+class VoskSpeechRecognizer(SpeechRecognizer):
+    """Offline recognition with Vosk (Kaldi) on the CPU.
+
+    The recognizer is restricted to a grammar of the phrases we're listening for, which makes it both faster and far more
+    accurate than open vocabulary recognition, and partial results are checked on every chunk so a position is picked up the
+    moment it's said. The model is loaded once, a recognizer for a given grammar is built per listen() (that's cheap).
+    """
+
+    name = "vosk"
+    streaming = True
+    offline = True
+
+    def __init__(self, model_path=VOSK_MODEL_PATH, audio_source=None):
+        import vosk
+        if not os.path.isdir(model_path):
+            raise FileNotFoundError(f"Vosk model not found at {model_path}. See the README for where to download it.")
+        vosk.SetLogLevel(-1)
+        self.vosk = vosk
+        self.model = vosk.Model(model_path)
+        self.audio_source = audio_source or MicrophoneStream()
+        self.audio_seconds = 0.0 #how much audio the last listen() needed before it had an answer
+
+    def recognizer_for(self, phrases, vocabulary=()):
+        # "[unk]" soaks up everything outside the grammar instead of forcing it onto the closest phrase
+        grammar = json.dumps(list(phrases) + list(vocabulary) + ["[unk]"])
+        return self.vosk.KaldiRecognizer(self.model, self.audio_source.sample_rate, grammar)
+
+    def listen(self, phrases=VALID_POSITIONS, timeout=LISTEN_TIMEOUT, phrase_time_limit=PHRASE_TIME_LIMIT, on_partial=None, vocabulary=(), verbose=True):
+        log = print if verbose else _silent
+        recognizer = self.recognizer_for(phrases, vocabulary)
+        heard_at = None
+        audio_seconds = 0.0
+        log("[LISTENING...]")
+
+        with closing(self.audio_source.chunks()) as chunks:
+            for chunk in chunks:
+                audio_seconds += len(chunk) / (2 * self.audio_source.sample_rate)
+                self.audio_seconds = audio_seconds
+
+                if recognizer.AcceptWaveform(chunk):
+                    text = _clean(json.loads(recognizer.Result()).get("text", ""))
+                else:
+                    text = _clean(json.loads(recognizer.PartialResult()).get("partial", ""))
+                    if text and on_partial is not None:
+                        on_partial(text)
+
+                if text:
+                    heard_at = heard_at or audio_seconds
+                    if find_phrase(text, phrases) is not None:
+                        log(f"[USER]: {text}")
+                        return text
+
+                if heard_at is None and audio_seconds >= timeout:
+                    log("[No speech detected]")
+                    return None
+                if heard_at is not None and audio_seconds - heard_at >= phrase_time_limit:
+                    break
+
+        text = _clean(json.loads(recognizer.FinalResult()).get("text", ""))
+        if not text:
+            log("[COULD NOT UNDERSTAND]")
+            return None
+        log(f"[USER]: {text}")
+        return text
+
+
+def _clean(text):
+    return " ".join(word for word in text.split() if word != "[unk]")
+
+
+RECOGNIZER_BACKENDS = {
+    GoogleSpeechRecognizer.name: GoogleSpeechRecognizer,
+    VoskSpeechRecognizer.name: VoskSpeechRecognizer,
+}
+
+
+def recognizer_class(backend=SPEECH_RECOGNIZER_BACKEND, model_path=VOSK_MODEL_PATH):
+    """Class create_speech_recognizer(backend) builds, without building it, so callers can tell e.g. whether it calibrates"""
+    if backend == "auto":
+        vosk_installed = importlib.util.find_spec("vosk") is not None
+        return VoskSpeechRecognizer if vosk_installed and os.path.isdir(model_path) else GoogleSpeechRecognizer
+    try:
+        return RECOGNIZER_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown speech recognizer '{backend}', choose from: auto, {', '.join(RECOGNIZER_BACKENDS)}") from None
+
+
+def create_speech_recognizer(backend=SPEECH_RECOGNIZER_BACKEND, **kwargs):
+    """Build a speech recognizer by name (see RECOGNIZER_BACKENDS). "auto" uses Vosk when it and its model are installed and Google otherwise"""
+    if backend == "auto":
+        try:
+            return VoskSpeechRecognizer(**kwargs)
+        except (ImportError, FileNotFoundError) as e:
+            print(f"Offline speech recognition isn't available ({e}), using Google")
+            return GoogleSpeechRecognizer()
+
+    return recognizer_class(backend)(**kwargs)
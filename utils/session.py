@@ -0,0 +1,379 @@
+import time
+
+import cv2
+
+from constant import (EDGE_THRESHOLD, GUIDANCE_INTERVAL, INITIAL_FACE_DETECTION_WAIT_TIME, FACING_CHECK_MAX_WAIT, REQUIRE_FACING_CAMERA,
+                      SMILE_CAPTURE_DELAY, SMILE_CAPTURE_WINDOW, SMOOTH_FACE_BOX, USE_FACE_ASSOCIATION, ZONE_HYSTERESIS_PX)
+from utils.association import FaceAssociator
+from utils.best_frame import BestFrameBuffer
+from utils.facing import FacingCheck
+from utils.guidance import get_facing_guidance, get_guidance_for_user
+from utils.metrics import frame_logging_enabled
+from utils.smoothing import BoxSmoother
+from utils.stability import StabilityWindow
+from utils.tts import PRIORITY_GUIDANCE, PRIORITY_URGENT
+from utils.zones import ZONE_NAMES, get_zone_layout, zone_from_name
+
+# kinds of events returned by SelfieSession.step
+FACE = "face"
+NO_FACE = "no_face"
+SPEECH = "speech"
+COUNTDOWN = "countdown"
+CAPTURE = "capture"
+
+# the fixed prompts of a session, utils.phrase_cache synthesizes them ahead of time
+HOLD_STILL_PROMPT = "Hold still"
+SMILE_PROMPT = "Perfect! Smile!"
+LOST_FACE_PROMPT = "I lost your face. {guidance}"
+EDGE_PROMPTS = { #the user was last seen against this edge of the frame
+    "left": "Take one side-step to your right",
+    "right": "Take one side-step to your left",
+    "top": "Take one step backwards without turning around",
+    "bottom": "Take one step forward",
+}
+OFFSCREEN_PROMPTS = { #last offscreen command -> (next command, what to say)
+    "initial": ("step_back", "No face detected yet. Please take two steps back without turning around."),
+    "step_back": ("move_left", "Perfect. Now take two side-steps towards your left side."),
+    "move_left": ("move_right", "Okay. Now take four side-steps towards your right side."),
+    "move_closer": ("final_adjust", "Now take one more step backward without turning around."),
+}
+OFFSCREEN_FALLBACK_PROMPT = "Please adjust your position slowly; I’ll keep guiding you."
+
+
+class SessionEvent:
+    """Something that happened while processing a frame, e.g. SessionEvent(SPEECH, text="Hold still")"""
+
+    def __init__(self, kind, t, **data):
+        self.kind = kind
+        self.t = t
+        self.__dict__.update(data)
+
+    def __repr__(self):
+        data = ", ".join(f"{k}={v!r}" for k, v in self.__dict__.items() if k not in ("kind", "t", "frame"))
+        return f"SessionEvent({self.kind}, t={self.t:.3f}, {data})"
+
+
+def null_speech(text, priority=PRIORITY_GUIDANCE, kind=None, wait=False):
+    """Speech sink that says nothing, for simulations and load tests"""
+    return None
+
+
+class SelfieSession:
+    """All the decision logic of one selfie session (guidance, countdown and capture), without any camera, window or clock of its own.
+
+    Everything with side effects is injected: the frame source (anything with read() like cv2.VideoCapture), the clock,
+    the face detector, the speech sink (called like utils.speech.speak) and the display sink (called with the rendered frame,
+    returns False to quit). step(frame, t) processes one frame and returns the events it caused, so sessions can be driven
+    from a live camera, recorded clips or a simulation.
+    """
+
+    def __init__(self, target_position, frame_size, detector=None, speech=null_speech, clock=time.time,
+                 frame_source=None, display=None, mirror=True, verbose=True, stability=None, best_frames=None, facing_check=None,
+                 associator=None, smoother=None):
+        self.target_position = target_position
+        self.frame_width, self.frame_height = frame_size
+        self.layout = get_zone_layout(self.frame_width, self.frame_height, "quadrants") #zone rectangles, computed once per resolution
+        self.target_zone = zone_from_name(target_position)
+        self.detector = detector
+        self.speech = speech
+        self.clock = clock
+        self.frame_source = frame_source
+        self.display = display
+        self.mirror = mirror
+        self.verbose = verbose
+
+        self.start_time = clock()
+        self.has_image_been_captured = False
+        self.captured_frame = None
+        self.last_guidance_time = self.start_time - GUIDANCE_INTERVAL
+
+        self.last_detected_quad_coords_of_user = None #if user has been seen or their face has been detected previously in the same session store that so that guidance is given based on this memory
+        self.user_last_detected_time = 0 #tracks the time when users face was last detected
+
+        self.offscreen_last_command = "initial" #to know what should be the next command to give to the user should be given based on the last guidance
+
+        self.has_countdown_started = False
+        self.last_countdown_value = None
+        self.stability = stability or StabilityWindow() #how long the face has been held still in the target
+        self.best_frames = best_frames or BestFrameBuffer() #sharpest frames of the hold still and then the smile window, the best one gets saved
+
+        #the picture is only taken once the user looks at the camera, checked with the eye cascade the best frames already use
+        if facing_check is None and REQUIRE_FACING_CAMERA and self.best_frames.eye_classifier is not None:
+            facing_check = FacingCheck(self.best_frames.eye_classifier)
+        self.facing_check = facing_check
+        self.facing_direction = None
+        self.facing_wait_started = None #when the user had held still long enough but wasn't facing the camera
+        self.smile_started = None #when "Perfect! Smile!" was said, the picture is picked from the frames that follow it
+
+        #every face is followed across frames so a bystander walking behind the user doesn't take over (None picks the largest face every frame)
+        if associator is None and USE_FACE_ASSOCIATION:
+            associator = FaceAssociator()
+        self.associator = associator
+
+        #the noisy detector box is filtered over time and zone edges get some slack, so jitter on an edge doesn't restart the countdown
+        if smoother is None and SMOOTH_FACE_BOX:
+            smoother = BoxSmoother()
+        self.smoother = smoother
+        self.zone_hysteresis = ZONE_HYSTERESIS_PX
+        self.current_zone = None
+
+        self.initial_face_detection = False
+        self.initial_face_detection_start = self.start_time
+
+        #what gets drawn on top of the preview until the next step
+        self.face_box_to_draw = None
+        self.countdown_to_draw = None
+
+        self._events = []
+
+    @property
+    def finished(self):
+        return self.has_image_been_captured
+
+    def change_target(self, target_position, t=None):
+        """Switch to another target position mid session (e.g. from a voice command), the countdown starts over"""
+        current_time = self.clock() if t is None else t
+        self.target_position = target_position
+        self.target_zone = zone_from_name(target_position)
+        self._restart_hold()
+        self.last_guidance_time = current_time - GUIDANCE_INTERVAL #guide towards the new target straight away
+
+    def _restart_hold(self):
+        self.stability.reset()
+        self.best_frames.reset()
+        self._reset_facing()
+        self.has_countdown_started = False
+        self.last_countdown_value = None
+        self.countdown_to_draw = None
+
+    def _reset_facing(self):
+        if self.facing_check is not None:
+            self.facing_check.reset()
+        self.facing_direction = None
+        self.facing_wait_started = None
+        self.smile_started = None
+
+    def _speak(self, t, text, priority=PRIORITY_GUIDANCE, kind=None, wait=False):
+        self._events.append(SessionEvent(SPEECH, t, text=text, priority=priority, speech_kind=kind))
+        self.speech(text, priority=priority, kind=kind, wait=wait)
+
+    def step(self, frame, t=None, faces=None):
+        """Process one frame taken at time t. Pass faces when detection already ran elsewhere (e.g. on the pipeline thread)"""
+        current_time = self.clock() if t is None else t
+        if faces is None:
+            faces = self.detector(frame)
+        self._events = []
+
+        # give a few seconds for initial detection before giving guidance
+        if not self.initial_face_detection:
+            if len(faces) > 0:
+                # face detected
+                self.initial_face_detection = True
+                self.user_last_detected_time = current_time
+            elif (current_time - self.initial_face_detection_start) >= INITIAL_FACE_DETECTION_WAIT_TIME:
+                # face wasn't detected proceed with the guidance
+                self.initial_face_detection = True
+            else:
+                return self._events
+
+        user_face = self._user_face(faces, current_time)
+        if user_face is not None and self.smoother is not None:
+            user_face = self.smoother.update(user_face, current_time)
+        if user_face is not None and not self.has_image_been_captured:
+            self._step_with_face(frame, user_face, current_time)
+        else:
+            self._step_without_face(current_time)
+
+        return self._events
+
+    def _user_face(self, faces, current_time):
+        """The face of the user taking the selfie among the faces found on this frame, None when they weren't found"""
+        if self.associator is not None:
+            #the user is whoever was locked onto first, other people are ignored until the user's track is lost
+            return self.associator.update(faces, current_time)
+        if len(faces) == 0:
+            return None
+        #choose the largest face
+        return max(faces, key=lambda f: f[2] * f[3])
+
+    def _step_with_face(self, frame, face, current_time):
+        x, y, w, h = face
+        self.face_box_to_draw = (x, y, w, h)
+
+        current_quadrant = self.layout.classify_point(x + w // 2, y + h // 2, self.current_zone, self.zone_hysteresis)
+        self.current_zone = current_quadrant
+        #once the user is holding still in the target, only leaving it by more than the hysteresis margin restarts the countdown
+        fully_in_target = self.layout.box_in_zone(x, y, w, h, self.target_zone, self.zone_hysteresis if self.stability.active else 0)
+
+        if self.verbose and frame_logging_enabled():
+            print(f"Face in: {ZONE_NAMES[current_quadrant]}, Target: {self.target_position}, Fully inside: {fully_in_target}")
+        self._events.append(SessionEvent(FACE, current_time, box=(x, y, w, h), zone=current_quadrant, fully_in_target=fully_in_target))
+
+        self.last_detected_quad_coords_of_user = (x, y, w, h)
+        self.offscreen_last_command = "initial"
+
+        if not fully_in_target:
+            #if the user is not in the target position guide them towards the target position
+            self.has_countdown_started = False
+            self.stability.reset()
+            self.best_frames.reset()
+            self._reset_facing()
+            self.countdown_to_draw = None
+
+            if current_time - self.last_guidance_time >= GUIDANCE_INTERVAL:
+                self._speak(current_time, get_guidance_for_user(current_quadrant, self.target_zone), kind="guidance")
+                self.last_guidance_time = current_time
+            return
+
+        # face is in the target position, the countdown restarts if it moves more than the allowed jitter
+        if self.stability.update((x, y, w, h), current_time):
+            self.best_frames.reset()
+            #a new hold window gets its own wait for the user to face the camera
+            self._reset_facing()
+
+        # the eye check only runs during the hold still window, on the top of the face and not on every frame (see FacingCheck)
+        facing = None
+        if self.facing_check is not None and frame is not None:
+            facing, self.facing_direction = self.facing_check.update(frame, (x, y, w, h))
+        #after the smile prompt only the frames where the user had time to smile are candidates
+        smiling = self.smile_started is not None and current_time - self.smile_started >= SMILE_CAPTURE_DELAY
+        if frame is not None and (self.smile_started is None or smiling):
+            self.best_frames.add(frame, (x, y, w, h), eyes_open=facing)
+
+        # when first entering stable zone
+        if not self.has_countdown_started:
+            self._speak(current_time, HOLD_STILL_PROMPT, priority=PRIORITY_URGENT, kind="guidance")
+            self.has_countdown_started = True
+
+        remaining_time = self.stability.remaining(current_time)
+        countdown = int((remaining_time / max(self.stability.hold_time, 1e-6)) * 3) + 1
+        countdown = min(max(countdown, 1), 3)
+        self.countdown_to_draw = countdown
+
+        if countdown != self.last_countdown_value and current_time - self.last_guidance_time >= 0.9:
+            self._events.append(SessionEvent(COUNTDOWN, current_time, value=countdown))
+            self._speak(current_time, str(countdown), priority=PRIORITY_URGENT, kind="countdown")
+            self.last_countdown_value = countdown
+            self.last_guidance_time = current_time
+
+        if self.stability.is_complete(current_time):
+            if self.smile_started is None:
+                just_completed = self.facing_wait_started is None
+                if just_completed:
+                    self.facing_wait_started = current_time
+                if facing is False and current_time - self.facing_wait_started < FACING_CHECK_MAX_WAIT:
+                    #held still long enough but looking away, wait a little for them to face the camera before taking the picture
+                    if just_completed or current_time - self.last_guidance_time >= GUIDANCE_INTERVAL:
+                        self._speak(current_time, get_facing_guidance(self.facing_direction), kind="guidance")
+                        self.last_guidance_time = current_time
+                    return
+
+                #the frames kept so far were all taken before the user was asked to smile
+                self._speak(current_time, SMILE_PROMPT, priority=PRIORITY_URGENT)
+                self.best_frames.reset()
+                self.smile_started = current_time
+                self.countdown_to_draw = None
+                return
+
+            self.countdown_to_draw = None
+            if current_time - self.smile_started < SMILE_CAPTURE_DELAY + SMILE_CAPTURE_WINDOW:
+                return
+
+            #save the best frame of the smile window rather than whichever one is current
+            best = self.best_frames.best()
+            if best is not None:
+                frame, (x, y, w, h), _ = best
+
+            self.has_image_been_captured = True
+            self.captured_frame = frame
+            self.countdown_to_draw = None
+            self._events.append(SessionEvent(CAPTURE, current_time, frame=frame, box=(x, y, w, h), zone=current_quadrant,
+                                             session_time=current_time - self.start_time, hold_time=self.stability.elapsed(current_time)))
+
+    def _step_without_face(self, current_time):
+        # If face isn't detected or the image has been captured already
+        self.stability.reset()
+        self.best_frames.reset()
+        self._reset_facing()
+        self.has_countdown_started = False
+        self.last_countdown_value = None
+        self.face_box_to_draw = None
+        self.countdown_to_draw = None
+        self.current_zone = None
+        if self.smoother is not None:
+            self.smoother.reset()
+
+        if self.has_image_been_captured:
+            return
+        self._events.append(SessionEvent(NO_FACE, current_time))
+
+        if current_time - self.last_guidance_time < GUIDANCE_INTERVAL:
+            return
+
+        time_since_last_face_was_detected = current_time - self.user_last_detected_time if self.user_last_detected_time else None
+
+        if self.last_detected_quad_coords_of_user and time_since_last_face_was_detected is not None and time_since_last_face_was_detected <= GUIDANCE_INTERVAL:
+            self._speak(current_time, self._guidance_from_last_known_position(), kind="guidance")
+        else:
+            self._speak(current_time, self._next_offscreen_command(), kind="guidance")
+        self.last_guidance_time = current_time
+
+    def _guidance_from_last_known_position(self):
+        lx, ly, lw, lh = self.last_detected_quad_coords_of_user
+
+        towards_left = lx < (self.frame_width * EDGE_THRESHOLD)
+        towards_right = (lx + lw) > (self.frame_width * (1 - EDGE_THRESHOLD))
+        towards_top = ly < (self.frame_height * EDGE_THRESHOLD)
+        towards_bottom = (ly + lh) > (self.frame_height * (1 - EDGE_THRESHOLD))
+
+        if towards_left:
+            return EDGE_PROMPTS["left"]
+        if towards_right:
+            return EDGE_PROMPTS["right"]
+        if towards_top:
+            return EDGE_PROMPTS["top"]
+        if towards_bottom:
+            return EDGE_PROMPTS["bottom"]
+
+        last_q = self.layout.classify_point(lx + lw // 2, ly + lh // 2)
+        return LOST_FACE_PROMPT.format(guidance=get_guidance_for_user(last_q, self.target_zone))
+
+    def _next_offscreen_command(self):
+        #Users face hasn't been detected once in this session so just follow a pattern
+        self.offscreen_last_command, prompt = OFFSCREEN_PROMPTS.get(self.offscreen_last_command, ("initial", OFFSCREEN_FALLBACK_PROMPT))
+        return prompt
+
+    def render(self, frame):
+        """Draw the latest face box and countdown on a display frame"""
+        if self.face_box_to_draw is not None:
+            x, y, w, h = self.face_box_to_draw
+
+            #Only draw a bounding box around the face of the user (see _user_face)
+            cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 3)
+
+            #Draw a circular dot on the center of the face
+            cv2.circle(frame, (x + w // 2, y + h // 2), 5, (0, 0, 255), -1)
+
+        if self.countdown_to_draw is not None:
+            cv2.putText(frame, f"Hold still... {self.countdown_to_draw}",
+                        (self.frame_width // 2 - 150, 50),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 3)
+
+        return frame
+
+    def run(self):
+        """Drive the session synchronously from the injected frame source until a picture is taken, the source runs dry
+        or the display sink asks to quit. Returns every event that happened"""
+        events = []
+        while not self.finished:
+            ret, frame = self.frame_source.read()
+            if not ret:
+                break
+            if self.mirror:
+                frame = cv2.flip(frame, 1)
+
+            events.extend(self.step(frame))
+
+            if self.display is not None and self.display(self.render(frame.copy())) is False:
+                break
+        return events
@@ -0,0 +1,66 @@
+import math
+
+import numpy as np
+
+from constant import SMOOTHING_BETA, SMOOTHING_D_CUTOFF, SMOOTHING_MIN_CUTOFF
+
+
+def _alpha(dt, cutoff):
+    """Smoothing factor of a first order low-pass filter with this cutoff frequency (Hz) for a sample dt seconds after the last"""
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    """One-euro filter (Casiez et al. 2012) over a vector of values sampled at irregular times.
+
+    A low-pass filter whose cutoff rises with the speed of the signal: min_cutoff (Hz) removes jitter while the value
+    is still, beta raises the cutoff by that many Hz per unit/second of speed so real movement isn't lagged behind.
+    """
+
+    def __init__(self, min_cutoff=SMOOTHING_MIN_CUTOFF, beta=SMOOTHING_BETA, d_cutoff=SMOOTHING_D_CUTOFF):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.derivative = None
+        self.t = None
+
+    def __call__(self, value, t):
+        value = np.asarray(value, dtype=np.float64)
+        if self.value is None:
+            self.value = value
+            self.derivative = np.zeros_like(value)
+            self.t = t
+            return self.value
+
+        dt = t - self.t
+        if dt <= 0:
+            return self.value
+
+        a_d = _alpha(dt, self.d_cutoff)
+        self.derivative = a_d * (value - self.value) / dt + (1 - a_d) * self.derivative
+        cutoff = self.min_cutoff + self.beta * np.abs(self.derivative)
+        a = _alpha(dt, cutoff)
+        self.value = a * value + (1 - a) * self.value
+        self.t = t
+        return self.value
+
+
+class BoxSmoother:
+    """Smooths the face box between the detector and the zone decisions, so the noise of a single Haar box doesn't
+    push the face out of the target. The center and the size are filtered, the box keeps the (x, y, w, h) int format"""
+
+    def __init__(self, min_cutoff=SMOOTHING_MIN_CUTOFF, beta=SMOOTHING_BETA, d_cutoff=SMOOTHING_D_CUTOFF):
+        self.filter = OneEuroFilter(min_cutoff, beta, d_cutoff)
+
+    def reset(self):
+        self.filter.reset()
+
+    def update(self, box, t):
+        x, y, w, h = box
+        cx, cy, w, h = self.filter((x + w / 2, y + h / 2, w, h), t)
+        return (int(round(cx - w / 2)), int(round(cy - h / 2)), int(round(w)), int(round(h)))
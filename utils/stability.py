@@ -0,0 +1,56 @@
+import math
+
+from constant import STABLE_EMA_ALPHA, STABLE_HOLD_TIME, STABLE_MAX_JITTER_PX
+
+
+class StabilityWindow:
+    """Decides when the face has been held still long enough, based on wall-clock time instead of counted frames.
+
+    The face center is smoothed with an exponential moving average. The window restarts whenever the raw center
+    moves more than max_jitter pixels away from the smoothed one, and is complete after hold_time seconds without that
+    happening, no matter how many frames per second the machine manages.
+    """
+
+    def __init__(self, hold_time=STABLE_HOLD_TIME, max_jitter=STABLE_MAX_JITTER_PX, alpha=STABLE_EMA_ALPHA):
+        self.hold_time = hold_time
+        self.max_jitter = max_jitter
+        self.alpha = alpha
+        self.started_at = None
+        self.smoothed_center = None
+
+    @property
+    def active(self):
+        return self.started_at is not None
+
+    def reset(self):
+        self.started_at = None
+        self.smoothed_center = None
+
+    def update(self, box, t):
+        """Feed the face box seen at time t. Returns True when it moved too much and the window restarted"""
+        x, y, w, h = box
+        center = (x + w / 2, y + h / 2)
+
+        if self.smoothed_center is None:
+            self.smoothed_center = center
+            self.started_at = t
+            return False
+
+        jitter = math.hypot(center[0] - self.smoothed_center[0], center[1] - self.smoothed_center[1])
+        if jitter > self.max_jitter:
+            self.smoothed_center = center
+            self.started_at = t
+            return True
+
+        self.smoothed_center = (self.alpha * center[0] + (1 - self.alpha) * self.smoothed_center[0],
+                                self.alpha * center[1] + (1 - self.alpha) * self.smoothed_center[1])
+        return False
+
+    def elapsed(self, t):
+        return t - self.started_at if self.started_at is not None else 0.0
+
+    def remaining(self, t):
+        return max(self.hold_time - self.elapsed(t), 0.0)
+
+    def is_complete(self, t):
+        return self.started_at is not None and self.elapsed(t) >= self.hold_time
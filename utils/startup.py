@@ -0,0 +1,107 @@
+import threading
+import time
+
+# taken when this module is first imported, the app imports it before cv2 and the speech stack so those count towards startup
+PROCESS_START = time.perf_counter()
+
+
+class LazyResource:
+    """Something expensive to create (microphone, camera, cascade...) that is only built when it's first needed, once.
+
+    start() builds it on a background thread so it can warm up while something else happens (e.g. the welcome prompt),
+    get() returns it, waiting for the background build if it's still running. Errors raised while building are raised again from get().
+    """
+
+    def __init__(self, factory, name=None):
+        self.factory = factory
+        self.name = name or getattr(factory, "__name__", "resource")
+        self.build_time = None
+        self._value = None
+        self._error = None
+        self._built = False
+        self._started = False
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._built
+
+    def start(self):
+        """Start building in the background, does nothing if it's already built or being built"""
+        if self._claim():
+            threading.Thread(target=self._build, name=f"selfie-warmup-{self.name}", daemon=True).start()
+        return self
+
+    def get(self):
+        if self._claim():
+            self._build()
+        self._done.wait()
+
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+    def _claim(self):
+        """True for the one caller that gets to build it"""
+        with self._lock:
+            if self._started:
+                return False
+            self._started = True
+            return True
+
+    def _build(self):
+        # the factory runs outside the lock, so ready, start() and get() on other threads don't wait for a slow build to take it
+        started = time.perf_counter()
+        value = error = None
+        try:
+            value = self.factory()
+        except Exception as e:
+            error = e
+        with self._lock:
+            self._value, self._error = value, error
+            self.build_time = time.perf_counter() - started
+            self._built = True
+        self._done.set()
+
+
+class StartupProfile:
+    """Times the startup phases from process start to the first displayed frame, for --profile-startup"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.marks = []
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def mark(self, phase):
+        """Record that a phase has just ended"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.marks.append((phase, time.perf_counter() - PROCESS_START))
+
+    def add_resource(self, resource):
+        """Record how long a LazyResource took to build, it may have been built in parallel with other phases"""
+        if self.enabled and resource.build_time is not None:
+            with self._lock:
+                self.marks.append((f"{resource.name} (background, took {resource.build_time * 1000:.0f} ms)", None))
+
+    def finish(self, phase="first frame displayed"):
+        """Mark the last phase and print the report, only the first call does anything"""
+        if not self.enabled or self.finished:
+            return
+        self.mark(phase)
+        self.finished = True
+        print(self.report())
+
+    def report(self):
+        lines = ["[STARTUP] phase                                          since start    phase"]
+        previous = 0.0
+        for phase, at in self.marks:
+            if at is None:
+                lines.append(f"[STARTUP] {phase}")
+                continue
+            lines.append(f"[STARTUP] {phase:<46} {at * 1000:9.0f} ms {(at - previous) * 1000:6.0f} ms")
+            previous = at
+        return "\n".join(lines)
@@ -0,0 +1,170 @@
+import json
+import os
+import platform
+import queue
+import subprocess
+import tempfile
+import threading
+from datetime import datetime
+
+import cv2
+
+from constant import IMAGE_FORMAT, IMAGES_DIR, JPEG_QUALITY, OPEN_IMAGE_AFTER_SAVE, PNG_COMPRESSION, SAVE_METADATA_SIDECAR, WEBP_QUALITY
+
+
+def encode_params(image_format):
+    """cv2.imencode extension and parameters for jpg, png or webp"""
+    image_format = image_format.lower().lstrip(".")
+    if image_format in ("jpg", "jpeg"):
+        return ".jpg", [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY]
+    if image_format == "png":
+        return ".png", [cv2.IMWRITE_PNG_COMPRESSION, PNG_COMPRESSION]
+    if image_format == "webp":
+        return ".webp", [cv2.IMWRITE_WEBP_QUALITY, WEBP_QUALITY]
+    raise ValueError(f"Unsupported image format '{image_format}', use jpg, png or webp")
+
+
+def write_atomically(path, data):
+    """Write to a temp file next to path and rename it into place, so a crash never leaves a half written file behind"""
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=os.path.splitext(path)[1])
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def open_in_viewer(filename):
+    """Open the image in the default viewer without waiting for it"""
+    try:
+        system = platform.system()
+        if system == "Windows":
+            os.startfile(filename)
+        elif system == "Darwin":
+            subprocess.Popen(["open", filename], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+        else:
+            subprocess.Popen(["xdg-open", filename], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    except Exception as e:
+        print(f"Image saved but couldn't open it automatically: {e}")
+
+
+class SaveJob:
+    """A picture waiting to be written. The filename is known straight away, wait() blocks until it is on disk"""
+
+    def __init__(self, filename, frame, metadata, open_after_save):
+        self.filename = filename
+        self.frame = frame
+        self.metadata = metadata
+        self.open_after_save = open_after_save
+        self.error = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+
+class ImageWriter:
+    """Encodes and writes pictures on a background thread so saving never stalls the camera loop.
+
+    Files get collision-free names, are written atomically (temp file + rename) with the configured format and quality,
+    and can get a JSON sidecar with the capture metadata (target zone, face box, timing...).
+    """
+
+    def __init__(self, directory=IMAGES_DIR, image_format=IMAGE_FORMAT, sidecar=SAVE_METADATA_SIDECAR, open_after_save=OPEN_IMAGE_AFTER_SAVE):
+        self.directory = directory
+        self.extension, self.params = encode_params(image_format)
+        self.sidecar = sidecar
+        self.open_after_save = open_after_save
+        self._reserved = set()
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._start()
+
+    def _start(self):
+        # every writer thread gets its own queue, so a closed writer's stop marker can't stop the next one
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, args=(self._queue,), name="selfie-image-writer", daemon=True)
+        self._thread.start()
+
+    def _unique_filename(self):
+        # milliseconds in the name plus a counter, so two pictures in the same second don't overwrite each other
+        now = datetime.now()
+        base = os.path.join(self.directory, f"selfie_{now:%Y%m%d_%H%M%S}_{now.microsecond // 1000:03d}")
+        with self._lock:
+            filename = base + self.extension
+            counter = 2
+            while filename in self._reserved or os.path.exists(filename):
+                filename = f"{base}_{counter}{self.extension}"
+                counter += 1
+            self._reserved.add(filename)
+        return filename
+
+    def save(self, frame, metadata=None, open_after_save=None):
+        """Queue the frame to be saved and return its SaveJob right away. The frame must not be modified afterwards"""
+        os.makedirs(self.directory, exist_ok=True)
+        job = SaveJob(self._unique_filename(), frame, metadata, self.open_after_save if open_after_save is None else open_after_save)
+        with self._lock:
+            #saving again after close() (e.g. the next kiosk user) starts a new writer thread
+            if self._thread is None:
+                self._start()
+            self._queue.put(job)
+        return job
+
+    def close(self, timeout=None):
+        """Finish writing everything that was queued"""
+        with self._lock:
+            thread, jobs = self._thread, self._queue
+            self._thread = self._queue = None
+        if thread is not None:
+            jobs.put(None)
+            thread.join(timeout)
+
+    def _run(self, jobs):
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            try:
+                self._write(job)
+            except Exception as e:
+                job.error = e
+                print(f"Couldn't save the image {job.filename}: {e}")
+            finally:
+                job.frame = None
+                with self._lock:
+                    self._reserved.discard(job.filename)
+                job._done.set()
+
+    def _write(self, job):
+        ok, encoded = cv2.imencode(self.extension, job.frame, self.params)
+        if not ok:
+            raise IOError("encoding failed")
+        write_atomically(job.filename, encoded.tobytes())
+
+        if self.sidecar and job.metadata is not None:
+            metadata = dict(job.metadata, filename=os.path.basename(job.filename), saved_at=datetime.now().isoformat())
+            write_atomically(os.path.splitext(job.filename)[0] + ".json", json.dumps(metadata, indent=2, default=str).encode())
+
+        if job.open_after_save:
+            open_in_viewer(job.filename)
+
+
+_image_writer = None
+_image_writer_lock = threading.Lock()
+
+
+def get_image_writer():
+    global _image_writer
+    with _image_writer_lock:
+        if _image_writer is None:
+            _image_writer = ImageWriter()
+        return _image_writer
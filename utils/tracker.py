@@ -0,0 +1,111 @@
+import cv2
+
+from constant import TRACKER_MIN_CONFIDENCE, TRACKER_REDETECT_INTERVAL, TRACKER_SEARCH_MARGIN, TRACKER_TEMPLATE_WIDTH
+from utils.association import iou_matrix
+from utils.detectors import to_gray
+
+
+class TemplateTracker:
+    """Follows one face box by template matching inside a small search window around where it was last seen.
+
+    The template and the search window are shrunk so the template is only TRACKER_TEMPLATE_WIDTH pixels wide,
+    which keeps every update far cheaper than running the cascade over the whole frame.
+    """
+
+    def __init__(self, search_margin=TRACKER_SEARCH_MARGIN, min_confidence=TRACKER_MIN_CONFIDENCE, template_width=TRACKER_TEMPLATE_WIDTH):
+        self.search_margin = search_margin
+        self.min_confidence = min_confidence
+        self.template_width = template_width
+        self.box = None
+        self.confidence = 0.0
+        self._template = None
+        self._scale = 1.0
+
+    def init(self, gray, box):
+        x, y, w, h = [int(v) for v in box]
+        self._scale = min(self.template_width / max(w, 1), 1.0)
+        face = gray[y:y + h, x:x + w]
+        self._template = cv2.resize(face, None, fx=self._scale, fy=self._scale, interpolation=cv2.INTER_AREA)
+        self.box = (x, y, w, h)
+        self.confidence = 1.0
+
+    def reset(self):
+        self.box = None
+        self._template = None
+        self.confidence = 0.0
+
+    def update(self, gray):
+        """Find the face again in the new frame. Returns the box or None when the match isn't good enough"""
+        if self.box is None:
+            return None
+
+        frame_h, frame_w = gray.shape[:2]
+        x, y, w, h = self.box
+        margin_x = int(w * self.search_margin)
+        margin_y = int(h * self.search_margin)
+
+        x0, y0 = max(x - margin_x, 0), max(y - margin_y, 0)
+        x1, y1 = min(x + w + margin_x, frame_w), min(y + h + margin_y, frame_h)
+
+        roi = cv2.resize(gray[y0:y1, x0:x1], None, fx=self._scale, fy=self._scale, interpolation=cv2.INTER_AREA)
+        template_h, template_w = self._template.shape[:2]
+
+        # the face is pushed against the frame edge so there isn't room to search for it
+        if roi.shape[0] < template_h or roi.shape[1] < template_w:
+            self.confidence = 0.0
+            return None
+
+        result = cv2.matchTemplate(roi, self._template, cv2.TM_CCOEFF_NORMED)
+        _, self.confidence, _, best_location = cv2.minMaxLoc(result)
+
+        if self.confidence < self.min_confidence:
+            return None
+
+        self.box = (x0 + int(best_location[0] / self._scale), y0 + int(best_location[1] / self._scale), w, h)
+        return self.box
+
+
+class DetectThenTrack:
+    """Runs the full face detector every few frames and tracks the face in between.
+
+    Drop-in replacement for a detect(frame) function or FaceDetector. Detection runs again after TRACKER_REDETECT_INTERVAL tracked frames,
+    or straight away when the tracker loses confidence.
+    """
+
+    def __init__(self, detect, redetect_interval=TRACKER_REDETECT_INTERVAL, tracker=None):
+        self.detect = detect
+        self.redetect_interval = redetect_interval
+        self.tracker = tracker or TemplateTracker()
+        self.frames_since_detection = 0
+        self.detections = 0
+        self.tracked_frames = 0
+
+    def __call__(self, frame):
+        gray_frame = to_gray(frame)
+
+        if self.tracker.box is not None and self.frames_since_detection < self.redetect_interval:
+            box = self.tracker.update(gray_frame)
+            if box is not None:
+                self.frames_since_detection += 1
+                self.tracked_frames += 1
+                return [box]
+
+        # detectors that work on grayscale get the frame converted above instead of converting it again
+        faces = self.detect(gray_frame if getattr(self.detect, "grayscale", False) else frame)
+        self.detections += 1
+        self.frames_since_detection = 0
+
+        if len(faces) > 0:
+            self.tracker.init(gray_frame, self._face_to_track(faces))
+        else:
+            self.tracker.reset()
+
+        return faces
+
+    def _face_to_track(self, faces):
+        """Keep following the same person when there are several faces: the one overlapping the tracked box, else the largest"""
+        if self.tracker.box is not None:
+            overlaps = iou_matrix([self.tracker.box], faces)[0]
+            if overlaps.max() > 0:
+                return faces[int(overlaps.argmax())]
+        return max(faces, key=lambda f: f[2] * f[3])
@@ -0,0 +1,279 @@
+import itertools
+import platform
+import queue
+import shutil
+import subprocess
+import threading
+import time
+
+from constant import TTS_PHRASE_CACHE, TTS_RATE
+from utils.metrics import get_metrics
+
+# lower number is spoken first
+PRIORITY_URGENT = 0
+PRIORITY_GUIDANCE = 1
+PRIORITY_INFO = 2
+
+
+class SayEngine:
+    """macOS "say" command"""
+
+    def __init__(self, rate=None):
+        self.rate = rate
+        self.voice = None
+        self._process = None
+
+    def speak(self, text):
+        rate_args = ['-r', str(self.rate)] if self.rate else []
+        self._process = subprocess.Popen(['say', *rate_args, text])
+        self._process.wait()
+
+    def synthesize(self, text, path):
+        """Write the speech to a 16 bit WAV file instead of playing it"""
+        rate_args = ['-r', str(self.rate)] if self.rate else []
+        subprocess.run(['say', *rate_args, '-o', path, '--file-format=WAVE', '--data-format=LEI16@22050', text], check=True)
+
+    def stop(self):
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+
+
+class Pyttsx3Engine:
+    """pyttsx3 engine (SAPI5 on windows). The engine is built once and reused for every utterance"""
+
+    def __init__(self, rate=TTS_RATE):
+        import pyttsx3
+        self._engine = pyttsx3.init()
+        self._engine.setProperty('rate', rate)
+        self.rate = rate
+        self.voice = self._engine.getProperty('voice')
+
+    def speak(self, text):
+        self._engine.say(text)
+        self._engine.runAndWait()
+
+    def synthesize(self, text, path):
+        self._engine.save_to_file(text, path)
+        self._engine.runAndWait()
+
+    def stop(self):
+        self._engine.stop()
+
+
+class EspeakEngine:
+    """espeak / espeak-ng command line, used on linux when pyttsx3 isn't around"""
+
+    def __init__(self, executable, rate=TTS_RATE):
+        self.executable = executable
+        self.rate = rate
+        self.voice = None
+        self._process = None
+
+    def speak(self, text):
+        self._process = subprocess.Popen([self.executable, '-s', str(self.rate), text], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self._process.wait()
+
+    def synthesize(self, text, path):
+        subprocess.run([self.executable, '-s', str(self.rate), '-w', path, text], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+
+    def stop(self):
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+
+
+class NullEngine:
+    """Doesn't make any sound, the text is already printed by the service. Used for headless runs and tests"""
+
+    def speak(self, text):
+        pass
+
+    def stop(self):
+        pass
+
+
+def create_platform_engine(system=None):
+    """Pick the best TTS engine for this platform, falling back to a silent engine"""
+    system = system or platform.system()
+
+    try:
+        if system == "Darwin":
+            return SayEngine()
+        if system == "Windows":
+            return Pyttsx3Engine()
+
+        espeak = shutil.which("espeak-ng") or shutil.which("espeak")
+        if espeak:
+            return EspeakEngine(espeak)
+    except Exception as e:
+        print("TTS Error", e)
+
+    return NullEngine()
+
+
+def create_engine(system=None, phrase_cache=TTS_PHRASE_CACHE):
+    """The platform engine, playing phrases it has said before from the phrase cache when there is an audio player for it"""
+    engine = create_platform_engine(system)
+    if phrase_cache and hasattr(engine, "synthesize"):
+        try:
+            from utils.phrase_cache import create_cached_engine #imported here, it needs the session prompts which need this module
+            return create_cached_engine(engine) or engine
+        except Exception as e:
+            #e.g. TTS_PHRASE_CACHE_DIR can't be created, speak without the cache
+            print("TTS cache Error", e)
+    return engine
+
+
+class Utterance:
+    """Handle for a queued piece of speech so that the caller can wait for it or check if it was replaced"""
+
+    def __init__(self, text, priority, kind):
+        self.text = text
+        self.priority = priority
+        self.kind = kind
+        self.queued_at = time.perf_counter()
+        self.cancelled = False
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def _finish(self):
+        self._done.set()
+
+
+class SpeechService:
+    """Speaks utterances on a background thread so that the video loop never waits on text to speech.
+
+    Utterances go through a priority queue. Queuing something with a kind (e.g. "guidance" or "countdown") replaces
+    an utterance of the same kind that is still waiting, so the user never hears guidance that is already out of date.
+    """
+
+    def __init__(self, engine_factory=create_engine):
+        self._engine_factory = engine_factory
+        self._engine = None
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._pending_by_kind = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._speaking = threading.Event()
+        self._ready = threading.Event()
+        self._last_speech_end = None
+        self._thread = threading.Thread(target=self._run, name="selfie-tts", daemon=True)
+        self._thread.start()
+
+    @property
+    def is_speaking(self):
+        return self._speaking.is_set()
+
+    def spoke_since(self, t):
+        """True if something is being spoken or was spoken after time.monotonic() t, e.g. to ignore our own voice on the microphone"""
+        return self.is_speaking or (self._last_speech_end is not None and self._last_speech_end > t)
+
+    def say(self, text, priority=PRIORITY_GUIDANCE, kind=None):
+        utterance = Utterance(text, priority, kind)
+
+        with self._lock:
+            if kind is not None:
+                stale = self._pending_by_kind.get(kind)
+                if stale is not None:
+                    stale.cancelled = True
+                    stale._finish()
+                self._pending_by_kind[kind] = utterance
+            self._idle.clear()
+            self._queue.put((priority, next(self._counter), utterance))
+
+        return utterance
+
+    def wait_until_ready(self, timeout=None):
+        """Wait for the TTS engine to be created, the service starts creating it as soon as it exists"""
+        return self._ready.wait(timeout)
+
+    def wait_until_idle(self, timeout=None):
+        return self._idle.wait(timeout)
+
+    def clear(self):
+        """Drop everything that hasn't been spoken yet"""
+        with self._lock:
+            while True:
+                try:
+                    _, _, utterance = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                utterance.cancelled = True
+                utterance._finish()
+            self._pending_by_kind.clear()
+            if not self.is_speaking:
+                self._idle.set()
+
+    def stop(self):
+        self.clear()
+        self._queue.put((-1, next(self._counter), None))
+        self._thread.join(timeout=2)
+
+    def _run(self):
+        # the engine is created on this thread since pyttsx3 has to be driven from the thread that created it.
+        # If that fails the service stays silent rather than leaving everyone waiting on it
+        try:
+            self._engine = self._engine_factory()
+        except Exception as e:
+            print("TTS Error", e)
+            self._engine = NullEngine()
+        finally:
+            self._ready.set()
+        metrics = get_metrics()
+
+        # engines with background work (the phrase cache synthesizing phrases) do it here, one piece at a time while nothing is queued
+        idle_work = getattr(self._engine, "idle_work", None)
+
+        while True:
+            if idle_work is not None and self._queue.empty() and idle_work():
+                continue
+            _, _, utterance = self._queue.get()
+            if utterance is None:
+                self._engine.stop()
+                return
+
+            with self._lock:
+                if self._pending_by_kind.get(utterance.kind) is utterance:
+                    del self._pending_by_kind[utterance.kind]
+                if utterance.cancelled:
+                    self._mark_idle_if_empty()
+                    continue
+                self._speaking.set()
+
+            # how long it waited behind other speech, then how long it took to say
+            metrics.observe("tts_wait", (time.perf_counter() - utterance.queued_at) * 1000)
+            try:
+                with metrics.time("tts"):
+                    self._engine.speak(utterance.text)
+            except Exception as e:
+                print("TTS Error", e)
+            finally:
+                with self._lock:
+                    self._last_speech_end = time.monotonic()
+                    self._speaking.clear()
+                    utterance._finish()
+                    self._mark_idle_if_empty()
+
+    def _mark_idle_if_empty(self):
+        if self._queue.empty():
+            self._idle.set()
+
+
+_speech_service = None
+_speech_service_lock = threading.Lock()
+
+
+def get_speech_service():
+    """One speech service (and therefore one TTS engine) for the whole process"""
+    global _speech_service
+    with _speech_service_lock:
+        if _speech_service is None:
+            _speech_service = SpeechService()
+        return _speech_service
@@ -1,17 +1,15 @@
-from datetime import datetime
-import subprocess
-import platform
 import cv2
-import os
+
+from utils.storage import get_image_writer
+from utils.zones import Zone, get_zone_layout
 
 def draw_quadrants_and_center_box(frame):
     height, width = frame.shape[:2]
     center_coords_x = width // 2
     center_coords_y = height // 2
     
-    # define center box size (let's assign 30% of the screen to the width and 45% to height such that we can have the face detector bounding box exactly inside the center rectangle)
-    center_box_width = int(width * 0.3) 
-    center_box_height = int(height * 0.45)
+    # the center box comes from the zone layout (CENTER_BOX_*_RATIO) so what is drawn is exactly what the face is checked against
+    center_left, center_top, center_right, center_bottom = get_zone_layout(width, height, "quadrants").rects[Zone.CENTER]
     
     # draw a vertical center line
     cv2.line(frame, (center_coords_x, 0), (center_coords_x, height), (255, 255, 255), 2)
@@ -20,9 +18,7 @@ def draw_quadrants_and_center_box(frame):
     cv2.line(frame, (0, center_coords_y), (width, center_coords_y), (255, 255, 255), 2)
     
     # draw the center box
-    top_left = (center_coords_x - center_box_width // 2, center_coords_y - center_box_height // 2)
-    bottom_right = (center_coords_x + center_box_width // 2, center_coords_y + center_box_height // 2)
-    cv2.rectangle(frame, top_left, bottom_right, (0, 255, 0), 2)
+    cv2.rectangle(frame, (int(center_left), int(center_top)), (int(center_right), int(center_bottom)), (0, 255, 0), 2)
     
     # let's add labels to each quadrant and also teh center box
     font = cv2.FONT_HERSHEY_COMPLEX
@@ -35,74 +31,23 @@ def draw_quadrants_and_center_box(frame):
     return frame
 
 def get_current_postion_where_the_face_lies(face_center_x_pos, face_center_y_pos, frame_w, frame_h):
-    cx, cy = frame_w // 2, frame_h // 2
-    
-    #Get the center zone width and height
-    center_w = int(frame_w * 0.3)
-    center_h = int(frame_h * 0.45)
-    
-    if (cx - center_w // 2) < face_center_x_pos < (cx + center_w // 2) and (cy - center_h // 2) < face_center_y_pos < (cy + center_h // 2):
-        return "center"
-    if face_center_x_pos < cx and face_center_y_pos < cy:
-        return "top-left"
-    if face_center_x_pos >= cx and face_center_y_pos < cy:
-        return "top-right"
-    if face_center_x_pos < cx and face_center_y_pos >= cy:
-        return "bottom-left"
-    
-    return "bottom-right"
+    layout = get_zone_layout(frame_w, frame_h, "quadrants")
+    return layout.names[layout.classify_point(face_center_x_pos, face_center_y_pos)]
 
 def is_face_fully_in_target(x, y, w, h, target, frame_w, frame_h):
-    cx, cy = frame_w // 2, frame_h // 2
-    
-    #Get the center zone width and height
-    center_w = int(frame_w * 0.3)
-    center_h = int(frame_h * 0.45)
-    
-    # Get the coordinates of the center zone
-    center_left = cx - center_w // 2
-    center_right = cx + center_w // 2
-    center_top = cy - center_h // 2
-    center_bottom = cy + center_h // 2
+    layout = get_zone_layout(frame_w, frame_h, "quadrants")
+    if target not in layout.names:
+        return False
+    return layout.box_in_zone(x, y, w, h, layout.zone_id(target))
 
-    #Get the face coordinates
-    face_left = x
-    face_right = x + w
-    face_top = y
-    face_bottom = y + h
-
-    if target == "center":
-        return (face_left >= center_left and face_right <= center_right and
-                face_top >= center_top and face_bottom <= center_bottom)
-    if target == "top-left":
-        return face_right <= cx and face_bottom <= cy
-    if target == "top-right":
-        return face_left >= cx and face_bottom <= cy
-    if target == "bottom-left":
-        return face_right <= cx and face_top >= cy
-    if target == "bottom-right":
-        return face_left >= cx and face_top >= cy
-    
-    return False
-
-def save_image(frame):
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"images/selfie_{ts}.jpg"
+def save_image(frame, metadata=None, wait=False):
+    """Save the picture on the background image writer (see utils.storage) and return its filename straight away"""
+    job = get_image_writer().save(frame, metadata)
     
-    cv2.imwrite(filename, frame)
+    if wait:
+        job.wait()
     
-    try:
-        system = platform.system()
-        if system == "Windows":
-            os.startfile(filename)
-        elif system == "Darwin": 
-            subprocess.run(["open", filename])
-        else: 
-            subprocess.run(["xdg-open", filename])
-    except Exception as e:
-        print(f"Image saved but couldn't open it automatically: {e}")
-    
-    return filename
+    return job.filename
 
 def check_if_user_is_facing_the_camera(gray, x, y, w, h, eye_classifier):
     """Check if user is facing the camera and if not return where is he facing towards left or right"""
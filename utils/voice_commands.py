@@ -0,0 +1,112 @@
+import queue
+import threading
+import time
+
+from constant import VALID_POSITIONS, VOICE_COMMAND_ECHO_GUARD, VOICE_COMMAND_LISTEN_TIMEOUT, VOICE_COMMAND_PHRASE_LIMIT
+from utils.recognizers import find_phrase
+
+# kinds of voice commands
+RETAKE = "retake"
+CHANGE_TARGET = "change_target"
+CANCEL = "cancel"
+
+RETAKE_WORDS = ("retake", "again", "another")
+CANCEL_WORDS = ("cancel", "stop", "quit")
+
+# what the streaming recognizers listen for, everything else is ignored. Hearing a phrase completes a command, the vocabulary only leads up to one
+COMMAND_PHRASES = list(RETAKE_WORDS + CANCEL_WORDS) + VALID_POSITIONS
+COMMAND_VOCABULARY = ["take it", "change to", "move to"]
+
+
+class VoiceCommand:
+    """A command the user said, e.g. VoiceCommand(CHANGE_TARGET, "change to top left", position="top-left")"""
+
+    def __init__(self, kind, text, position=None):
+        self.kind = kind
+        self.text = text
+        self.position = position
+
+    def __repr__(self):
+        return f"VoiceCommand({self.kind}, {self.text!r}, position={self.position!r})"
+
+
+def parse_command(text):
+    """Spot a command in what the user said, None if there isn't one"""
+    if not text:
+        return None
+    words = text.lower().split()
+
+    if any(word in CANCEL_WORDS for word in words):
+        return VoiceCommand(CANCEL, text)
+    position = find_phrase(" ".join(words), VALID_POSITIONS)
+    if position is not None:
+        return VoiceCommand(CHANGE_TARGET, text, position=position.replace(" ", "-"))
+    if any(word in RETAKE_WORDS for word in words):
+        return VoiceCommand(RETAKE, text)
+    return None
+
+
+class VoiceCommandListener:
+    """Listens for voice commands on a background thread while the camera loop keeps going.
+
+    Commands are queued and picked up with poll() from the session loop, which never blocks on the microphone.
+    Listening pauses while the app itself is talking, and anything heard while a prompt was playing (or just after it,
+    see VOICE_COMMAND_ECHO_GUARD) is thrown away so the app doesn't take its own prompts for commands.
+    """
+
+    def __init__(self, recognizer, speech_service, timeout=VOICE_COMMAND_LISTEN_TIMEOUT, phrase_time_limit=VOICE_COMMAND_PHRASE_LIMIT,
+                 echo_guard=VOICE_COMMAND_ECHO_GUARD):
+        self.recognizer = recognizer
+        self.speech_service = speech_service
+        self.timeout = timeout
+        self.phrase_time_limit = phrase_time_limit
+        self.echo_guard = echo_guard
+        self._commands = queue.Queue()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="selfie-voice-commands", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop listening. Waits for the listener thread to exit, however long the current listen takes, so nobody else
+        opens the microphone while it still has it (speech_recognition raises when a microphone is opened twice)"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def poll(self):
+        """Every command heard since the last poll, oldest first"""
+        commands = []
+        while True:
+            try:
+                commands.append(self._commands.get_nowait())
+            except queue.Empty:
+                return commands
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if self.speech_service.spoke_since(time.monotonic() - self.echo_guard):
+                time.sleep(0.05)
+                continue
+
+            started = time.monotonic()
+            try:
+                text = self.recognizer.listen(COMMAND_PHRASES, timeout=self.timeout, phrase_time_limit=self.phrase_time_limit,
+                                             vocabulary=COMMAND_VOCABULARY, verbose=False)
+            except Exception as e:
+                print(f"[ERROR]: voice commands stopped: {e}")
+                return
+
+            # our own prompt started while we were listening, whatever was heard may be the app talking
+            if self._stop_event.is_set() or self.speech_service.spoke_since(started - self.echo_guard):
+                continue
+
+            command = parse_command(text)
+            if command is not None:
+                print(f"[USER]: {text}")
+                self._commands.put(command)
@@ -0,0 +1,127 @@
+from enum import IntEnum
+from functools import lru_cache
+
+import numpy as np
+
+from constant import CENTER_BOX_HEIGHT_RATIO, CENTER_BOX_WIDTH_RATIO, ZONE_LAYOUT
+
+
+class Zone(IntEnum):
+    """Zones of the default quadrant layout"""
+    TOP_LEFT = 0
+    TOP_RIGHT = 1
+    BOTTOM_LEFT = 2
+    BOTTOM_RIGHT = 3
+    CENTER = 4
+
+
+ZONE_NAMES = ("top-left", "top-right", "bottom-left", "bottom-right", "center")
+OUTSIDE_FRAME = 1 << 30
+
+
+def zone_from_name(name):
+    """Zone for a position name like "top-left" (or "top left" as spoken)"""
+    return Zone(ZONE_NAMES.index(name.replace(" ", "-")))
+
+
+class ZoneLayout:
+    """Zone rectangles for one frame resolution, built once and reused for every frame.
+
+    rects holds one (x0, y0, x1, y1) row per zone. A box is fully in a zone when it lies within that rectangle (edges included).
+    A point belongs to the first zone in classification order whose classification rectangle [x0, x1) x [y0, y1) holds it,
+    which is how the center box takes priority over the quadrants it overlaps. classify() and containment() work on
+    arrays of boxes at once for multi-face frames and offline analysis, classify_point() and box_in_zone() are the cheap
+    single face versions used every frame.
+    """
+
+    def __init__(self, width, height, names, rects, classify_rects=None, classify_order=None):
+        self.width = width
+        self.height = height
+        self.names = tuple(names)
+        self.rects = np.asarray(rects, dtype=np.int32).reshape(-1, 4)
+        self.classify_rects = self.rects if classify_rects is None else np.asarray(classify_rects, dtype=np.int32).reshape(-1, 4)
+        self.classify_order = np.asarray(range(len(self.names)) if classify_order is None else classify_order, dtype=np.intp)
+
+        # plain python copies for the single face per frame path, numpy call overhead would dominate there
+        self._rect_tuples = [tuple(int(v) for v in rect) for rect in self.rects]
+        self._classify_tuples = [(int(i), tuple(int(v) for v in self.classify_rects[i])) for i in self.classify_order]
+
+    @classmethod
+    def quadrants(cls, width, height, center_width_ratio=CENTER_BOX_WIDTH_RATIO, center_height_ratio=CENTER_BOX_HEIGHT_RATIO):
+        """The four quadrants plus the center box the app has always used"""
+        cx, cy = width // 2, height // 2
+        center_w, center_h = int(width * center_width_ratio), int(height * center_height_ratio)
+        center = (cx - center_w // 2, cy - center_h // 2, cx + center_w // 2, cy + center_h // 2)
+
+        # the quadrants' outer edges reach past the frame so boxes sticking out of it still count as being in that quadrant
+        far = OUTSIDE_FRAME
+        rects = [(-far, -far, cx, cy), (cx, -far, far, cy), (-far, cy, cx, far), (cx, cy, far, far), center]
+        # a face center exactly on the center box edge counts as being in the quadrant
+        classify_rects = rects[:4] + [(center[0] + 1, center[1] + 1, center[2], center[3])]
+        order = [Zone.CENTER, Zone.TOP_LEFT, Zone.TOP_RIGHT, Zone.BOTTOM_LEFT, Zone.BOTTOM_RIGHT]
+        return cls(width, height, ZONE_NAMES, rects, classify_rects, order)
+
+    @classmethod
+    def thirds(cls, width, height):
+        """Rule of thirds grid, 3x3 zones named like "top-left", "top", ..., "bottom-right" """
+        xs = [0, width // 3, 2 * width // 3, width]
+        ys = [0, height // 3, 2 * height // 3, height]
+        rows, columns = ("top", "", "bottom"), ("left", "", "right")
+        names, rects = [], []
+        for row in range(3):
+            for column in range(3):
+                names.append("-".join(part for part in (rows[row], columns[column]) if part) or "center")
+                rects.append((xs[column], ys[row], xs[column + 1], ys[row + 1]))
+        return cls(width, height, names, rects)
+
+    def zone_id(self, name):
+        return self.names.index(name.replace(" ", "-"))
+
+    def classify_point(self, x, y, previous=None, margin=0):
+        """Zone id of a single point, e.g. the face center. With a previous zone the point has to be more than margin pixels
+        into another zone before it leaves the previous one (hysteresis, so a face sitting on an edge doesn't flip every frame)"""
+        zone = self._classify(x, y)
+        if margin and previous is not None and zone != previous:
+            if any(self._classify(x + dx, y + dy) == previous for dx, dy in ((-margin, 0), (margin, 0), (0, -margin), (0, margin))):
+                return previous
+        return zone
+
+    def _classify(self, x, y):
+        for zone, (x0, y0, x1, y1) in self._classify_tuples:
+            if x0 <= x < x1 and y0 <= y < y1:
+                return zone
+        return int(self.classify_order[-1])
+
+    def box_in_zone(self, x, y, w, h, zone, margin=0):
+        """Whether the box is fully inside the zone grown by margin pixels on every side"""
+        x0, y0, x1, y1 = self._rect_tuples[zone]
+        return x >= x0 - margin and x + w <= x1 + margin and y >= y0 - margin and y + h <= y1 + margin
+
+    def classify(self, boxes):
+        """Zone id of the center of every (x, y, w, h) box, as an int array"""
+        boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        centers_x = (boxes[:, 0] + boxes[:, 2] // 2)[:, None]
+        centers_y = (boxes[:, 1] + boxes[:, 3] // 2)[:, None]
+
+        rects = self.classify_rects[self.classify_order]
+        inside = (centers_x >= rects[:, 0]) & (centers_x < rects[:, 2]) & (centers_y >= rects[:, 1]) & (centers_y < rects[:, 3])
+
+        # first matching zone in classification order, the last zone when nothing matched
+        first_match = np.where(inside.any(axis=1), inside.argmax(axis=1), len(rects) - 1)
+        return self.classify_order[first_match]
+
+    def containment(self, boxes):
+        """(boxes x zones) bool matrix telling which zones every (x, y, w, h) box is fully inside"""
+        boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        left, top = boxes[:, 0:1], boxes[:, 1:2]
+        right, bottom = left + boxes[:, 2:3], top + boxes[:, 3:4]
+        rects = self.rects
+        return (left >= rects[:, 0]) & (right <= rects[:, 2]) & (top >= rects[:, 1]) & (bottom <= rects[:, 3])
+
+
+@lru_cache(maxsize=8)
+def get_zone_layout(width, height, layout=ZONE_LAYOUT):
+    """Zone layout for a resolution, built once and cached"""
+    if layout == "thirds":
+        return ZoneLayout.thirds(width, height)
+    return ZoneLayout.quadrants(width, height)